@@ -0,0 +1,59 @@
+"""Measure the memory taken per message tracked by the chat message buffer.
+
+Run from the project root:
+    python -m benchmarks.message_buffer [--chats N] [--messages N] [--text-length N]
+"""
+import argparse
+import random
+import string
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+from core.message_buffer import ChatMessageBuffer
+
+_NAMES = ["Алексей", "Мария", "Иван", "Ольга", "Дмитрий", "Анна", "Sergey", "Kate"]
+
+def _fake_message(chat_id: int, message_id: int, text: str):
+    user_id = random.randrange(1000)
+    return SimpleNamespace(
+        id=message_id,
+        chat=SimpleNamespace(id=chat_id),
+        from_user=SimpleNamespace(id=user_id, first_name=_NAMES[user_id % len(_NAMES)]),
+        sender_chat=None,
+        text=text,
+        caption=None,
+        reply_to_message=None,
+        date=datetime.now()
+    )
+
+def run(chats: int, messages: int, text_length: int):
+    buffer = ChatMessageBuffer(max_chats=chats, idle_ttl=float("inf"), max_bytes=2 ** 62)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    # The updates are freed after recording, as in the bot, so only what the buffer retains is measured
+    for chat_id in range(chats):
+        for message_id in range(messages):
+            buffer.record(_fake_message(chat_id, message_id, "".join(random.choices(string.ascii_letters + " ", k=text_length))))
+
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    traced = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    stats = buffer.stats()
+
+    print(f"chats:                 {stats['chats']}")
+    print(f"tracked messages:      {stats['messages']}")
+    print(f"traced memory:         {traced / 1024 / 1024:.2f} MiB")
+    print(f"bytes per message:     {traced / stats['messages']:.0f} (traced), {stats['bytes'] / stats['messages']:.0f} (budget estimate)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=20, help="Messages recorded per chat")
+    parser.add_argument("--text-length", type=int, default=100)
+    args = parser.parse_args()
+
+    run(args.chats, args.messages, args.text_length)
@@ -5,10 +5,10 @@ MODERATION_PROMPT = """You are an AI chat moderator assistant. Your role is to a
 
 You must respond in the following format:
 ACTION: [none/mute/ban/delete]  
-REASON: [brief explanation in Russian language]  
 DURATION: [time in seconds or 0 for permanent]  
-WARNING: [warning message if needed]  
-CONFIDENCE: [0.0-1.0]
+CONFIDENCE: [0.0-1.0]  
+REASON: [brief explanation in Russian language]  
+WARNING: [warning message if needed]
 
 Your role is to:
 - Monitor chat messages for inappropriate content, including toxicity, insults, and passive aggression
@@ -30,5 +30,107 @@ Important:
 Stay neutral and precise. Think like a thoughtful, fair moderator.
 """
 
+BATCH_MODERATION_PROMPT = """Several messages of this context were flagged. Make a separate decision for every flagged message.
+Respond with one block per flagged message, each block starting with its id:
+ID: [message id]
+ACTION: [none/mute/ban/delete]
+DURATION: [time in seconds or 0 for permanent]
+CONFIDENCE: [0.0-1.0]
+REASON: [brief explanation in Russian language]
+WARNING: [warning message if needed]
+"""
+
 # -------------- Logging --------------
-STANDARD_LOG_LEVEL = logging.DEBUG
\ No newline at end of file
+STANDARD_LOG_LEVEL = logging.DEBUG
+
+# -------------- MongoDB --------------
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_TIME_MS = 60_000
+
+# -------------- Admin roster --------------
+ADMIN_ROSTER_TTL = 600
+ADMIN_ROSTER_MAX_CHATS = 2000
+
+# -------------- API cache --------------
+API_CACHE_MAX_SIZE = 5000
+CHAT_MEMBER_CACHE_TTL = 120
+CHAT_CACHE_TTL = 600
+USER_CACHE_TTL = 600
+API_NEGATIVE_CACHE_TTL = 60
+
+# -------------- Detection --------------
+DETECTION_MODE = "fuzzy"  # "inline", "regex" (thread pool, no fuzzy matching) or "fuzzy" (process pool)
+DETECTION_MAX_WORKERS = 2
+DETECTION_MAX_PENDING = 64
+PATTERNS_REFRESH_INTERVAL = 60
+
+# -------------- Banned words --------------
+BANNED_WORDS_CACHE_MAX_CHATS = 1000
+BANNED_WORDS_CACHE_MAX_BYTES = 16 * 1024 * 1024
+BANNED_WORDS_CACHE_TTL = 3600
+
+# -------------- AI decision cache --------------
+DECISION_CACHE_MAX_SIZE = 2000
+DECISION_CACHE_TTL = 1800
+DECISION_CACHE_MIN_CONFIDENCE = 0.8
+
+# -------------- Spam clusters --------------
+SPAM_CLUSTER_MAX_CLUSTERS = 2000
+SPAM_CLUSTER_TTL = 900
+SPAM_CLUSTER_HALF_LIFE = 120
+SPAM_CLUSTER_MIN_SIMILARITY = 0.6  # Estimated Jaccard similarity of the message shingles
+SPAM_CLUSTER_MIN_CONFIDENCE = 0.8
+SPAM_CLUSTER_MAX_TEXT = 1000  # Characters of a message fingerprinted, near-duplicates share their beginning
+
+# -------------- AI requests --------------
+AI_MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+AI_MAX_PROMPT_TOKENS = 3000
+AI_MAX_COMPLETION_TOKENS = 200
+AI_TOKENIZER_ENCODING = "cl100k_base"  # Used with tiktoken if it is installed
+AI_CHARS_PER_TOKEN = 3  # Fallback estimate for mixed Russian/English text
+
+# -------------- AI batching --------------
+AI_BATCH_WINDOW = 0.5  # Seconds to collect flagged messages of a chat before asking the model
+AI_BATCH_MAX_ITEMS = 10
+
+# -------------- AI scheduler --------------
+AI_MAX_CONCURRENCY = 4  # Model requests in flight at once
+AI_MAX_QUEUE = 200  # Requests waiting for a free slot, new ones are rejected beyond it
+AI_QUEUE_TIMEOUT = 30  # Seconds a request may wait for a free slot
+AI_NEW_MEMBER_PERIOD = 24 * 60 * 60  # Members who joined within it are moderated first
+RECENT_JOINS_MAX_SIZE = 50_000  # Recently joined members tracked for it
+
+# -------------- AI outages --------------
+AI_REQUEST_TIMEOUT = 15  # Seconds a single model request may take, per AI_MAX_COMPLETION_TOKENS of its completion budget
+AI_LATENCY_SLO = 8  # Seconds to the first streamed piece (or per completion budget) over which a request counts as a failure
+AI_BREAKER_FAILURE_THRESHOLD = 5
+AI_BREAKER_RESET_TIMEOUT = 60  # Seconds before a probe request is let through
+AI_FALLBACK_MUTE_DURATION = 60 * 60
+
+# -------------- AI streaming --------------
+AI_STREAMING = True  # Stream responses and act as soon as ACTION and CONFIDENCE are parsed
+
+# -------------- Message buffer --------------
+MESSAGE_BUFFER_SIZE = 20  # Recent messages per chat used as the AI context
+MESSAGE_BUFFER_MAX_CHATS = 10000
+MESSAGE_BUFFER_IDLE_TTL = 6 * 60 * 60  # Seconds a chat without messages stays buffered
+MESSAGE_BUFFER_MAX_TEXT = 500  # Characters kept per message text
+MESSAGE_BUFFER_MAX_BYTES = 64 * 1024 * 1024  # Memory budget of all buffered messages
+
+# -------------- Flood detection --------------
+FLOOD_USER_RATE = 1.0  # Messages per second a user may keep sending
+FLOOD_USER_BURST = 8
+FLOOD_LINK_RATE = 0.1  # Messages with links per second
+FLOOD_LINK_BURST = 3
+FLOOD_CHAT_RATE = 20.0  # Messages per second in a chat before it is treated as a raid
+FLOOD_CHAT_BURST = 60
+FLOOD_RAID_COST = 2  # Tokens a user message costs during a raid, halving the user limits
+FLOOD_REPEAT_THRESHOLD = 4  # Identical messages in a row that count as a flood
+FLOOD_REPEAT_WINDOW = 60
+FLOOD_MUTE_DURATION = 10 * 60
+FLOOD_MAX_TRACKED_USERS = 50000
+FLOOD_IDLE_TTL = 5 * 60  # Seconds after which an idle sender's counters are dropped
+
+# -------------- Stats --------------
+STATS_LOG_INTERVAL = 10 * 60  # Seconds between debug logs of the cache, queue and filter stats
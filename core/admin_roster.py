@@ -0,0 +1,82 @@
+from typing import Set
+
+from pyrogram.enums import ChatMembersFilter, ChatMemberStatus
+
+from core import api_cache
+from core.cache import AsyncTTLCache
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, ADMIN_ROSTER_TTL, ADMIN_ROSTER_MAX_CHATS, API_NEGATIVE_CACHE_TTL
+
+_log = Log("AdminRoster")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+ADMIN_STATUSES = (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER)
+
+class AdminRoster:
+    """A per-chat cache of administrator ids, kept separately for every client.
+
+    The roster of a chat is fetched with a single get_chat_members(filter=ADMINISTRATORS)
+    sweep and kept fresh by ChatMemberUpdated updates, so admin checks don't need a
+    get_chat_member request per user.
+    """
+
+    def __init__(self, ttl: int = ADMIN_ROSTER_TTL, max_chats: int = ADMIN_ROSTER_MAX_CHATS):
+        # Concurrent misses for the same chat share one sweep, failed sweeps are cached as None
+        self._rosters = AsyncTTLCache("admin_rosters", max_chats, ttl, API_NEGATIVE_CACHE_TTL)
+
+    async def get_admins(self, client, chat_id: int) -> Set[int] | None:
+        """Return the set of admin ids of the chat, fetching the roster if it is missing or expired."""
+        async def fetch_roster():
+            try:
+                _log.getLogger().debug(f"Fetching admin roster of chat {chat_id}...")
+                admins = {
+                    member.user.id
+                    async for member in client.get_chat_members(chat_id, filter=ChatMembersFilter.ADMINISTRATORS)
+                    if member.user is not None
+                }
+                _log.getLogger().debug(f"Admin roster of chat {chat_id} fetched: {len(admins)} admins")
+                return admins
+            except Exception as e:
+                _log.getLogger().error(f"Failed to fetch admin roster of chat {chat_id}: {e}")
+                return None
+
+        return await self._rosters.get_or_load((client.name, chat_id), fetch_roster)
+
+    async def is_admin(self, client, chat_id: int, user_id: int) -> bool:
+        admins = await self.get_admins(client, chat_id)
+        if admins is not None:
+            return user_id in admins
+
+        # The roster is not available (e.g. no rights to list admins), ask about this user only
+        member = await api_cache.get_chat_member(client, chat_id, user_id)
+        return member.status in ADMIN_STATUSES
+
+    async def on_chat_member_updated(self, client, update):
+        """ChatMemberUpdated handler that keeps the cached rosters and members in sync."""
+        chat_id = update.chat.id
+
+        member = update.new_chat_member or update.old_chat_member
+        if member is None or member.user is None:
+            return
+
+        api_cache.invalidate_chat_member(client, chat_id, member.user.id)
+
+        admins = self._rosters.get((client.name, chat_id))
+        if admins is None:
+            return
+
+        if update.new_chat_member is not None and update.new_chat_member.status in ADMIN_STATUSES:
+            admins.add(member.user.id)
+        else:
+            admins.discard(member.user.id)
+
+        _log.getLogger().debug(f"Admin roster of chat {chat_id} updated for user {member.user.id}")
+
+    def invalidate(self, client, chat_id: int):
+        self._rosters.invalidate((client.name, chat_id))
+
+    def stats(self) -> dict:
+        return self._rosters.stats()
+
+admin_roster = AdminRoster()
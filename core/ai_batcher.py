@@ -0,0 +1,179 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+from handlers.public._actions import ModDecision, ModAction
+from enums import AIPriority
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, AI_BATCH_WINDOW, AI_BATCH_MAX_ITEMS
+
+from .ai_scheduler import AIScheduler, ScheduledRequest, ai_scheduler
+
+_log = Log("AIBatcher")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+@dataclass
+class _BatchItem:
+    message_id: int
+    texts: List[str]
+    method: str
+    future: asyncio.Future
+
+@dataclass
+class _ChatBatch:
+    build_context: Callable[[], Awaitable[List[str]]]
+    priority: int = AIPriority.NORMAL
+    items: Dict[int, _BatchItem] = field(default_factory=dict)  # By user id
+    timer: asyncio.Task | None = None
+    request: ScheduledRequest | None = None
+
+class AIBatcher:
+    """Collects the flagged messages of a chat and analyzes them in one model request.
+
+    The first flagged message of a chat opens a batch that is submitted to the AI scheduler after
+    'window' seconds or as soon as it holds 'max_items' users. Until the scheduler starts it, the
+    batch keeps collecting messages, so a long queue makes batches bigger instead of longer.
+    Messages of a user who is already in the batch are merged into that user's entry and share
+    its decision. The context is built once per batch, from the newest submitted message, and
+    the model returns one decision per message id, which is fanned out to the waiting callers.
+    """
+
+    def __init__(self, ai, scheduler: AIScheduler = ai_scheduler, window: float = AI_BATCH_WINDOW, max_items: int = AI_BATCH_MAX_ITEMS):
+        """Initialize the batcher.
+        :param ai: The AIManager instance.
+        :param scheduler: The scheduler that limits concurrent model requests.
+        :param window: How long a batch collects messages before it is queued, in seconds.
+        :param max_items: The number of users that closes a batch right away.
+        """
+        self.ai = ai
+        self.scheduler = scheduler
+        self.window = window
+        self.max_items = max_items
+
+        self._batches: Dict[int, _ChatBatch] = {}
+
+        self._requests = 0
+        self._messages = 0
+        self._merged = 0
+
+    async def analyze(
+        self,
+        chat_id: int,
+        user_id: int,
+        message_id: int,
+        text: str,
+        method: str,
+        build_context: Callable[[], Awaitable[List[str]]],
+        priority: int = AIPriority.NORMAL
+    ) -> ModDecision:
+        """Queue the flagged message into its chat's batch and wait for its decision.
+        :param chat_id: The chat of the message.
+        :param user_id: The sender, messages of the same sender in a batch share one decision.
+        :param message_id: The message id the model refers to in its answer.
+        :param text: The message text.
+        :param method: The detection method that flagged the message.
+        :param build_context: A coroutine function that builds the context lines of the chat.
+        :param priority: The AIPriority of the message.
+        """
+        batch = self._batches.get(chat_id)
+        if batch is None:
+            batch = self._batches[chat_id] = _ChatBatch(build_context, priority)
+            batch.timer = asyncio.create_task(self._submit_later(chat_id, batch))
+        else:
+            # The newest message builds the context, so every flagged message is inside it
+            batch.build_context = build_context
+
+        self._messages += 1
+
+        item = batch.items.get(user_id)
+        if item is None:
+            item = batch.items[user_id] = _BatchItem(message_id, [text], method, asyncio.get_running_loop().create_future())
+        else:
+            self._merged += 1
+            item.texts.append(text)
+
+        if priority < batch.priority:
+            batch.priority = priority
+            if batch.request is not None:
+                self.scheduler.raise_priority(batch.request, priority)
+
+        if len(batch.items) >= self.max_items:
+            self._detach(chat_id, batch)
+            if batch.request is None:
+                batch.timer.cancel()
+                self._submit(chat_id, batch)
+
+        return await asyncio.shield(item.future)
+
+    def _detach(self, chat_id: int, batch: _ChatBatch):
+        if self._batches.get(chat_id) is batch:
+            del self._batches[chat_id]
+
+    async def _submit_later(self, chat_id: int, batch: _ChatBatch):
+        await asyncio.sleep(self.window)
+        self._submit(chat_id, batch)
+
+    def _submit(self, chat_id: int, batch: _ChatBatch):
+        batch.request = self.scheduler.submit(
+            batch.priority,
+            lambda: self._analyze(chat_id, batch),
+            on_start=lambda: self._detach(chat_id, batch)
+        )
+        batch.request.future.add_done_callback(lambda future: self._deliver(chat_id, batch, future))
+
+    async def _analyze(self, chat_id: int, batch: _ChatBatch) -> Dict[int, ModDecision]:
+        items = list(batch.items.values())
+        self._requests += 1
+
+        context = await batch.build_context()
+
+        # With a streamed response the callers get their decision as soon as its action is parsed
+        if len(items) == 1:
+            item = items[0]
+            return {item.message_id: await self.ai.analyze_message_context(context, item.method, on_decision=lambda decision: self._resolve(item, decision))}
+
+        by_message_id = {item.message_id: item for item in items}
+
+        def on_decision(message_id: int, decision: ModDecision):
+            item = by_message_id.get(message_id)
+            if item is not None:
+                self._resolve(item, decision)
+
+        _log.getLogger().debug(f"Analyzing {len(items)} flagged users of chat {chat_id} in one request")
+        return await self.ai.analyze_batch(context, [(item.message_id, " | ".join(item.texts), item.method) for item in items], on_decision=on_decision)
+
+    def _resolve(self, item: _BatchItem, decision: ModDecision):
+        if not item.future.done():
+            item.future.set_result(decision)
+
+    def _deliver(self, chat_id: int, batch: _ChatBatch, future: asyncio.Future):
+        # A request rejected by the scheduler never starts, so on_start didn't detach the batch
+        self._detach(chat_id, batch)
+
+        reason = "No decision returned for the message"
+        if future.cancelled():
+            decisions = {}
+        elif future.exception() is not None:
+            _log.getLogger().error(f"Batch analysis failed: {future.exception()}")
+            decisions, reason = {}, str(future.exception())
+        else:
+            decisions = future.result()
+
+        for item in batch.items.values():
+            if item.future.done():
+                continue
+
+            decision = decisions.get(item.message_id)
+            if decision is None:
+                decision = ModDecision(action=ModAction.NONE, reason=reason, confidence=0.0, is_error=True)
+            self._resolve(item, decision)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self._requests,
+            "messages": self._messages,
+            "merged": self._merged,
+            "messages_per_request": self._messages / self._requests if self._requests else 0.0,
+            "open_batches": len(self._batches)
+        }
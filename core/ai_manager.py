@@ -1,15 +1,36 @@
+import asyncio
+from time import perf_counter
+
 from openai import AsyncOpenAI
-from typing import List, Dict
+from typing import Callable, List, Dict, Tuple
 
 from config import config
 from logger import Log
-from constants import STANDARD_LOG_LEVEL, MODERATION_PROMPT
+from constants import (
+    STANDARD_LOG_LEVEL,
+    MODERATION_PROMPT,
+    BATCH_MODERATION_PROMPT,
+    AI_MODEL,
+    AI_MAX_PROMPT_TOKENS,
+    AI_MAX_COMPLETION_TOKENS,
+    AI_REQUEST_TIMEOUT,
+    AI_LATENCY_SLO,
+    AI_BREAKER_FAILURE_THRESHOLD,
+    AI_BREAKER_RESET_TIMEOUT,
+    AI_STREAMING
+)
 from handlers.public._actions import ModDecision, ModAction
+from .circuit_breaker import CircuitBreaker
+from .decision_stream import DecisionStreamParser, build_decision
+from .token_budget import estimate_tokens, fit_lines
 
 _log = Log("AIManager")
 _log.getLogger().setLevel(STANDARD_LOG_LEVEL)
 _log.write_logs_to_file()
 
+# Shared by every AIManager instance, they all talk to the same endpoint
+ai_breaker = CircuitBreaker("llm", AI_BREAKER_FAILURE_THRESHOLD, AI_BREAKER_RESET_TIMEOUT, AI_LATENCY_SLO)
+
 class AIManager:
     def __init__(self):
         _key = config.get_ionet_key()
@@ -26,31 +47,143 @@ class AIManager:
             raise TypeError("Client must be an instance of AsyncOpenAI")
 
         self._system_prompt = MODERATION_PROMPT
-        self.messages = [{"role": "system", "content": self._system_prompt}]
+        self.max_prompt_tokens = AI_MAX_PROMPT_TOKENS
+
+    def _build_messages(self, content: str) -> List[Dict]:
+        """Build the messages of one request: the system prompt and this request only.
+        Nothing is kept between calls, so chats don't leak into each other and the prompt doesn't grow.
+        """
+        return [
+            {"role": "system", "content": self._system_prompt},
+            {"role": "user", "content": content}
+        ]
+
+    def _build_context_content(self, messages: List[str] | str, suffix: str) -> str:
+        """Format the context lines and the request as one user turn, trimming the oldest messages to the token budget."""
+        lines = messages.split("\n") if isinstance(messages, str) else [str(line) for line in messages]
+
+        prefix = "Analyze these messages context:\n"
+
+        # The context starts with a header and ends with the 'Triggered by' and closing lines
+        budget = self.max_prompt_tokens - estimate_tokens(self._system_prompt) - estimate_tokens(prefix + suffix)
+        lines = fit_lines(lines, budget, keep_head=1, keep_tail=2)
+
+        return prefix + "\n".join(lines) + suffix
+
+    async def _request(self, messages: List[Dict], model: str, max_completion_tokens: int) -> str:
+        response = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            stream=False,
+            max_completion_tokens=max_completion_tokens
+        )
+
+        if not response or not response.choices or not response.choices[0].message:
+            raise ValueError("Invalid response format from AI model")
+
+        return response.choices[0].message.content
+
+    async def _request_stream(self, messages: List[Dict], model: str, max_completion_tokens: int, on_text: Callable[[str], None]) -> str:
+        stream = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            stream=True,
+            max_completion_tokens=max_completion_tokens
+        )
+
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                on_text(text)
+
+        if not parts:
+            raise ValueError("Invalid response format from AI model")
+
+        return "".join(parts)
+
+    async def _complete(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_completion_tokens: int = AI_MAX_COMPLETION_TOKENS,
+        on_text: Callable[[str], None] | None = None
+    ) -> str:
+        """Send one completion request through the circuit breaker, bounded by AI_REQUEST_TIMEOUT.
+
+        A request for more than AI_MAX_COMPLETION_TOKENS, e.g. a batch, gets a proportionally longer
+        timeout and latency allowance, so a healthy long answer is not counted as a failure.
+        :param on_text: Receives the response piece by piece while it streams. The request is not streamed without it.
+        """
+        ai_breaker.before_call()
+        budget_scale = max(1.0, max_completion_tokens / AI_MAX_COMPLETION_TOKENS)
+        started = perf_counter()
+        first_text_at = None
+
+        def on_stream_text(text: str):
+            nonlocal first_text_at
+            if first_text_at is None:
+                first_text_at = perf_counter()
+            on_text(text)
 
-    async def analyze_message(self, message: str, model: str = "meta-llama/Llama-3.3-70B-Instruct") -> ModDecision:
         try:
-            if not isinstance(self.messages, List) or not all(isinstance(m, Dict) for m in self.messages):
-                raise TypeError("messages must be a list of dictionaries")
-            
-            if message:
-                self.messages.append({"role": "user", "content": f"Analyze this message: {message}"})
+            if on_text is not None and AI_STREAMING:
+                request = self._request_stream(messages, model, max_completion_tokens, on_stream_text)
+            else:
+                request = self._request(messages, model, max_completion_tokens)
 
-            _log.getLogger().debug("Starting to analyse the message...")
+            response_text = await asyncio.wait_for(request, AI_REQUEST_TIMEOUT * budget_scale)
+        except asyncio.CancelledError:
+            ai_breaker.abort_call()
+            raise
+        except Exception:
+            ai_breaker.record_failure()
+            raise
 
-            response = await self._client.chat.completions.create(
-                model=model,
-                messages=self.messages,
-                temperature=0.7,
-                stream=False,
-                max_completion_tokens=200
-            )
+        # The SLO is about the model's responsiveness, not the length of a healthy answer: a streamed
+        # response is timed to its first piece, a whole one is scaled down by its completion budget
+        if first_text_at is not None:
+            latency = first_text_at - started
+        else:
+            latency = (perf_counter() - started) / budget_scale
+        ai_breaker.record_success(latency)
 
-            _log.getLogger().debug(f"Response generated: {response.choices[0].message.content}")
-            if not response or not response.choices or not response.choices[0].message:
-                raise ValueError("Invalid response format from AI model")
+        _log.getLogger().debug(f"Response generated: {response_text}")
+        return response_text
+
+    async def _complete_decisions(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_completion_tokens: int = AI_MAX_COMPLETION_TOKENS,
+        on_decision: Callable[[int | None, ModDecision], None] | None = None
+    ) -> Dict[int | None, ModDecision]:
+        """Request decisions, passing each one to on_decision as soon as its ACTION and CONFIDENCE are streamed."""
+        parser = DecisionStreamParser(on_decision)
+        streamed = on_decision is not None and AI_STREAMING
 
-            response_text = response.choices[0].message.content
+        response_text = await self._complete(messages, model, max_completion_tokens, parser.feed if streamed else None)
+        if not streamed:
+            parser.feed(response_text)
+
+        return parser.close()
+
+    async def analyze_message(self, message: str, model: str = AI_MODEL) -> ModDecision:
+        try:
+            if not isinstance(message, str) or not message:
+                raise TypeError("message must be a non-empty string")
+
+            messages = self._build_messages(f"Analyze this message: {message}")
+
+            _log.getLogger().debug("Starting to analyse the message...")
+
+            response_text = await self._complete(messages, model)
             decision = self._parse_response(response_text)
             _log.getLogger().debug(f"Moderation decision: {decision}")
 
@@ -60,33 +193,37 @@ class AIManager:
             return ModDecision(
                 action=ModAction.NONE,
                 reason="Error processing message: " + str(e),
-                confidence=0.0
+                confidence=0.0,
+                is_error=True
             )
 
-    async def analyze_message_context(self, messages: List, method: str, model: str = "meta-llama/Llama-3.3-70B-Instruct") -> ModDecision:
+    async def analyze_message_context(
+        self,
+        messages: List[str] | str,
+        method: str,
+        model: str = AI_MODEL,
+        on_decision: Callable[[ModDecision], None] | None = None
+    ) -> ModDecision:
+        """Make a decision for the message that triggered the detection, the last one of the context.
+        :param on_decision: Receives the decision as soon as its action is known, the reason is filled in later.
+        """
         try:
-            if not isinstance(messages, List) or not all(isinstance(m, Dict) for m in self.messages):
-                raise TypeError("messages must be a list of dictionaries")
-            
-            if messages:
-                self.messages.append({"role": "user", "content": f"Analyze these messages context: {messages} and make a decision by prompt! Analyzed by {method}"})
+            if not messages or not isinstance(messages, (List, str)):
+                raise TypeError("messages must be a non-empty list of context lines")
 
-            _log.getLogger().debug("Starting to analyse the message...")
-            print(self.messages)
-
-            response = await self._client.chat.completions.create(
-                model=model,
-                messages=self.messages,
-                temperature=0.7,
-                stream=False,
-                max_completion_tokens=200
-            )
+            request = self._build_messages(self._build_context_content(messages, f"\nMake a decision by prompt! Analyzed by {method}"))
+
+            _log.getLogger().debug(f"Starting to analyse the message context (~{sum(estimate_tokens(m['content']) for m in request)} prompt tokens)...")
 
-            if not response or not response.choices or not response.choices[0].message:
+            decisions = await self._complete_decisions(
+                request,
+                model,
+                on_decision=(lambda _, decision: on_decision(decision)) if on_decision is not None else None
+            )
+            if None not in decisions:
                 raise ValueError("Invalid response format from AI model")
 
-            response_text = response.choices[0].message.content
-            decision = self._parse_response(response_text)
+            decision = decisions[None]
             _log.getLogger().debug(f"Moderation decision: {decision}")
 
             return decision
@@ -95,29 +232,74 @@ class AIManager:
             return ModDecision(
                 action=ModAction.NONE,
                 reason="Error processing message: " + str(e),
-                confidence=0.0
+                confidence=0.0,
+                is_error=True
             )
         
-    def _parse_response(self, response_text: str) -> ModDecision:
-        lines = response_text.strip().split("\n")
-        decision_data = {}
-
+    async def analyze_batch(
+        self,
+        messages: List[str] | str,
+        flagged: List[Tuple[int, str, str]],
+        model: str = AI_MODEL,
+        on_decision: Callable[[int, ModDecision], None] | None = None
+    ) -> Dict[int, ModDecision]:
+        """Make one decision per flagged message of a chat in a single request sharing one context.
+        :param messages: The context lines of the chat.
+        :param flagged: The flagged messages as (message id, text, detection method).
+        :param on_decision: Receives every message id and its decision as soon as the action is known.
+        :return: The decisions by message id. Messages the model skipped are missing.
+        """
         try:
-            for line in lines:
-                if ": " in line:
-                    key, value = line.split(": ", 1)
-                    decision_data[key.strip().upper()] = value.strip()
+            if not flagged:
+                return {}
 
-            return ModDecision(
-                action=ModAction(decision_data.get("ACTION", "none")),
-                reason=decision_data.get("REASON", "No reason provided"),
-                duration=int(decision_data.get("DURATION", 0)),
-                warning_text=decision_data.get("WARNING"),
-                confidence=float(decision_data.get("CONFIDENCE", 0.0))
+            flagged_lines = "\n".join(f"ID: {message_id} (analyzed by {method}): {text}" for message_id, text, method in flagged)
+            suffix = f"\n\nFlagged messages:\n{flagged_lines}\n\n{BATCH_MODERATION_PROMPT}"
+
+            request = self._build_messages(self._build_context_content(messages, suffix))
+
+            _log.getLogger().debug(f"Starting to analyse {len(flagged)} flagged messages in one request (~{sum(estimate_tokens(m['content']) for m in request)} prompt tokens)...")
+
+            def on_block_decision(message_id: int | None, decision: ModDecision):
+                # Lines before the first 'ID:' don't belong to any flagged message
+                if message_id is not None:
+                    on_decision(message_id, decision)
+
+            decisions = await self._complete_decisions(
+                request,
+                model,
+                AI_MAX_COMPLETION_TOKENS * len(flagged),
+                on_block_decision if on_decision is not None else None
             )
+            decisions = {message_id: decision for message_id, decision in decisions.items() if message_id is not None}
+            _log.getLogger().debug(f"Batch moderation decisions: {decisions}")
+
+            return decisions
         except Exception as e:
-            _log.getLogger().error(f"Error parsing response: {str(e)}")
-            raise ValueError("Invalid response format from AI model")
+            _log.getLogger().error(f"Error generating batch response: {str(e)}")
+            error = ModDecision(
+                action=ModAction.NONE,
+                reason="Error processing message: " + str(e),
+                confidence=0.0,
+                is_error=True
+            )
+            return {message_id: error for message_id, _, _ in flagged}
+
+    def _parse_batch_response(self, response_text: str) -> Dict[int, ModDecision]:
+        """Split the response into 'ID: <id>' blocks and parse every block as a single decision."""
+        parser = DecisionStreamParser()
+        parser.feed(response_text.strip())
+
+        return {message_id: decision for message_id, decision in parser.close().items() if message_id is not None}
+
+    def _parse_response(self, response_text: str) -> ModDecision:
+        decision_data = {}
+        for line in response_text.strip().split("\n"):
+            if ": " in line:
+                key, value = line.split(": ", 1)
+                decision_data[key.strip().upper()] = value.strip()
+
+        return build_decision(decision_data)
         
     def update_system_prompt(self, new_rules: str):
         if not isinstance(new_rules, str):
@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+from dataclasses import dataclass, field
+from itertools import count
+from time import monotonic
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, AI_MAX_CONCURRENCY, AI_MAX_QUEUE, AI_QUEUE_TIMEOUT
+
+_log = Log("AIScheduler")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class AIRequestRejected(Exception):
+    """The request was not sent to the model because the queue was full or it waited too long."""
+
+@dataclass(eq=False)
+class ScheduledRequest:
+    priority: int
+    job: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float
+    on_start: Callable[[], None] | None = None
+    timeout_handle: asyncio.TimerHandle | None = field(default=None, repr=False)
+    started: bool = False
+
+class AIScheduler:
+    """Runs model requests with a fixed concurrency limit, in priority order.
+
+    Requests wait in a heap ordered by (priority, arrival). A waiting request can be moved up with
+    raise_priority(). Requests that wait longer than queue_timeout, or arrive while max_queue
+    requests are already waiting, fail with AIRequestRejected instead of piling up.
+    """
+
+    def __init__(self, max_concurrency: int = AI_MAX_CONCURRENCY, max_queue: int = AI_MAX_QUEUE, queue_timeout: float = AI_QUEUE_TIMEOUT):
+        """Initialize the scheduler.
+        :param max_concurrency: The maximum number of requests in flight.
+        :param max_queue: The maximum number of waiting requests.
+        :param queue_timeout: How long a request may wait for a free slot, in seconds.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._heap: List[Tuple[int, int, ScheduledRequest]] = []
+        self._waiting = 0
+        self._running = 0
+        self._sequence = count()
+
+        self._started = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._max_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, priority: int, job: Callable[[], Awaitable[Any]], on_start: Callable[[], None] | None = None) -> ScheduledRequest:
+        """Queue a request. Its result or error is delivered through the returned request's future.
+        :param priority: The request priority, lower values go first.
+        :param job: A coroutine function that sends the request.
+        :param on_start: Called right before the job starts, e.g. to stop collecting more work into it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        request = ScheduledRequest(priority, job, future, monotonic(), on_start)
+
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            _log.getLogger().warning(f"AI queue is full ({self._waiting} waiting), rejecting the request")
+            self._fail(request, AIRequestRejected("The AI queue is full"))
+            return request
+
+        self._push(request)
+        self._waiting += 1
+        self._max_depth = max(self._max_depth, self._waiting)
+        request.timeout_handle = asyncio.get_running_loop().call_later(self.queue_timeout, self._expire, request)
+
+        self._dispatch()
+        return request
+
+    async def run(self, priority: int, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Queue a request and wait for its result."""
+        return await asyncio.shield(self.submit(priority, job).future)
+
+    def raise_priority(self, request: ScheduledRequest, priority: int):
+        """Move a waiting request up if the new priority is higher (lower value)."""
+        if request.started or request.future.done() or priority >= request.priority:
+            return
+
+        request.priority = priority
+        # The old heap entry becomes stale and is skipped when it is popped
+        self._push(request)
+
+    def _push(self, request: ScheduledRequest):
+        heapq.heappush(self._heap, (request.priority, next(self._sequence), request))
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency and self._heap:
+            priority, _, request = heapq.heappop(self._heap)
+            if request.started or request.future.done() or priority != request.priority:
+                continue
+
+            request.started = True
+            request.timeout_handle.cancel()
+            self._waiting -= 1
+            self._running += 1
+
+            waited = monotonic() - request.enqueued_at
+            self._started += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+            asyncio.create_task(self._run(request))
+
+    async def _run(self, request: ScheduledRequest):
+        try:
+            if request.on_start is not None:
+                request.on_start()
+            result = await request.job()
+        except Exception as e:
+            self._fail(request, e)
+        else:
+            request.future.set_result(result)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    def _expire(self, request: ScheduledRequest):
+        if request.started or request.future.done():
+            return
+
+        self._waiting -= 1
+        self._timed_out += 1
+        _log.getLogger().warning(f"AI request waited longer than {self.queue_timeout} s, dropping it")
+        self._fail(request, AIRequestRejected("The AI request timed out in the queue"))
+
+    def _fail(self, request: ScheduledRequest, error: Exception):
+        request.future.set_exception(error)
+        # Mark the exception as retrieved in case nobody is waiting for it
+        request.future.exception()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "queue_depth": self._waiting,
+            "max_queue_depth": self._max_depth,
+            "started": self._started,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_wait_ms": self._wait_total / self._started * 1000 if self._started else 0.0,
+            "max_wait_ms": self._wait_max * 1000
+        }
+
+ai_scheduler = AIScheduler()
@@ -0,0 +1,33 @@
+from pyrogram.errors import UserNotParticipant, PeerIdInvalid, UsernameNotOccupied
+
+from core.cache import AsyncTTLCache
+from constants import API_CACHE_MAX_SIZE, CHAT_MEMBER_CACHE_TTL, CHAT_CACHE_TTL, USER_CACHE_TTL, API_NEGATIVE_CACHE_TTL
+
+# Errors that mean "there is no such member/chat/user" are cached as negative entries
+_NOT_FOUND_ERRORS = (UserNotParticipant, PeerIdInvalid, UsernameNotOccupied)
+
+chat_members = AsyncTTLCache("chat_members", API_CACHE_MAX_SIZE, CHAT_MEMBER_CACHE_TTL, API_NEGATIVE_CACHE_TTL, _NOT_FOUND_ERRORS)
+chats = AsyncTTLCache("chats", API_CACHE_MAX_SIZE, CHAT_CACHE_TTL, API_NEGATIVE_CACHE_TTL, _NOT_FOUND_ERRORS)
+users = AsyncTTLCache("users", API_CACHE_MAX_SIZE, USER_CACHE_TTL, API_NEGATIVE_CACHE_TTL, _NOT_FOUND_ERRORS)
+
+async def get_chat_member(client, chat_id: int, user_id: int):
+    """Cached client.get_chat_member(). Concurrent lookups of the same member share one request."""
+    return await chat_members.get_or_load(
+        (client.name, chat_id, user_id),
+        lambda: client.get_chat_member(chat_id, user_id)
+    )
+
+async def get_chat(client, chat_id: int):
+    """Cached client.get_chat()."""
+    return await chats.get_or_load((client.name, chat_id), lambda: client.get_chat(chat_id))
+
+async def get_users(client, user_id: int):
+    """Cached client.get_users() for a single user."""
+    return await users.get_or_load((client.name, user_id), lambda: client.get_users(user_id))
+
+def invalidate_chat_member(client, chat_id: int, user_id: int):
+    """Drop the cached member, e.g. after restricting or banning the user."""
+    chat_members.invalidate((client.name, chat_id, user_id))
+
+def get_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (chat_members, chats, users)}
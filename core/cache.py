@@ -0,0 +1,229 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from time import monotonic
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("AsyncTTLCache")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_MISSING = object()
+
+class _NegativeEntry:
+    """A cached failure. Re-raised on every hit until it expires."""
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    coalesced: int = 0
+    loads: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+class AsyncTTLCache:
+    """A bounded LRU cache with TTL expiry, negative caching and single-flight loading.
+
+    Reads never take a lock: the cache is only touched from the event loop thread, so a
+    lookup is a plain dict access. Concurrent misses for the same key share one loader call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 1024,
+        ttl: float = 300,
+        negative_ttl: float | None = None,
+        negative_errors: Tuple[type, ...] = (),
+        weigher: Callable[[Any], int] | None = None,
+        max_weight: int | None = None
+    ):
+        """Initialize the cache.
+        :param name: The cache name used in logs and stats.
+        :param max_size: The maximum number of entries, the least recently used entry is evicted first.
+        :param ttl: Time to live of a cached value in seconds.
+        :param negative_ttl: Time to live of a cached None or error. Defaults to ttl.
+        :param negative_errors: Exception types raised by a loader that should be cached as negative entries.
+        :param weigher: A function returning the approximate size of a value, e.g. in bytes.
+        :param max_weight: The maximum total weight of the values, the least recently used entries are evicted first.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+
+        self.name = name
+        self._data: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._max_size = max_size
+        self._ttl = ttl
+        self._negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._negative_errors = negative_errors
+        self._weigher = weigher
+        self._max_weight = max_weight
+        self._weights: Dict[Hashable, int] = {}
+        self._total_weight = 0
+        self._stats = CacheStats()
+
+    def _remove(self, key: Hashable):
+        del self._data[key]
+        self._total_weight -= self._weights.pop(key, 0)
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+
+        value, expires_at = entry
+        if monotonic() >= expires_at:
+            self._remove(key)
+            self._stats.expirations += 1
+            return _MISSING
+
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value or default. A cached error is re-raised."""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self._stats.misses += 1
+            return default
+
+        self._stats.hits += 1
+        if isinstance(value, _NegativeEntry):
+            self._stats.negative_hits += 1
+            raise value.error
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if ttl is None:
+            ttl = self._negative_ttl if value is None or isinstance(value, _NegativeEntry) else self._ttl
+
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (value, monotonic() + ttl)
+
+        if self._weigher is not None and value is not None and not isinstance(value, _NegativeEntry):
+            weight = self._weigher(value)
+            self._weights[key] = weight
+            self._total_weight += weight
+
+        while len(self._data) > self._max_size or (
+            self._max_weight is not None and self._total_weight > self._max_weight and len(self._data) > 1
+        ):
+            self._remove(next(iter(self._data)))
+            self._stats.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None = None,
+        cache_if: Callable[[Any], bool] | None = None
+    ) -> Any:
+        """Return the cached value or load it, sharing one loader call between concurrent misses.
+        :param key: The cache key.
+        :param loader: A coroutine function that loads the value.
+        :param ttl: Time to live of the loaded value, the cache default is used if it is not specified.
+        :param cache_if: A predicate that decides whether the loaded value is stored.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self._stats.hits += 1
+            if isinstance(value, _NegativeEntry):
+                self._stats.negative_hits += 1
+                raise value.error
+            return value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._stats.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self._stats.misses += 1
+        self._stats.loads += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+
+        try:
+            value = await loader()
+        except self._negative_errors as e:
+            self.set(key, _NegativeEntry(e))
+            self._fail(future, e)
+            raise
+        except BaseException as e:
+            self._fail(future, e)
+            raise
+        else:
+            if cache_if is None or cache_if(value):
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._pending.pop(key, None)
+
+    def _fail(self, future: asyncio.Future, error: BaseException):
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+            return
+
+        future.set_exception(error)
+        # Mark the exception as retrieved in case nobody else is waiting for it
+        future.exception()
+
+    def invalidate(self, key: Hashable):
+        if key in self._data:
+            self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        for key in [key for key in self._data if predicate(key)]:
+            self._remove(key)
+
+    def clear(self):
+        self._data.clear()
+        self._weights.clear()
+        self._total_weight = 0
+
+    def purge_expired(self) -> int:
+        """Remove expired entries. Returns the number of removed entries."""
+        now = monotonic()
+        expired = [key for key, (_, expires_at) in self._data.items() if now >= expires_at]
+
+        for key in expired:
+            self._remove(key)
+
+        self._stats.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        stats = asdict(self._stats)
+        stats["size"] = len(self._data)
+        stats["max_size"] = self._max_size
+        if self._weigher is not None:
+            stats["weight"] = self._total_weight
+            stats["max_weight"] = self._max_weight
+
+        lookups = self._stats.hits + self._stats.misses
+        stats["hit_rate"] = self._stats.hits / lookups if lookups else 0.0
+
+        return stats
+
+    def log_stats(self):
+        _log.getLogger().debug(f"Cache '{self.name}' stats: {self.stats()}")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not _MISSING
@@ -0,0 +1,83 @@
+from typing import Dict
+
+from core.db_manager import DBManager
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("ChatRegistry")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_NOT_ALLOWED = None  # Negative entry for chats that are not in 'allowed-chats'
+
+class ChatRegistry:
+    """An in-memory copy of the 'allowed-chats' collection, keyed by chat_id.
+
+    Every known chat is stored with its automoderation flag, unknown chats are stored
+    as negative entries, so the filters in the hot path never touch the database.
+    """
+
+    def __init__(self):
+        self._db = DBManager("moderator-db", "allowed-chats")
+        self._chats: Dict[int, bool | None] = {}
+        self._is_loaded = False
+
+    async def load(self) -> bool:
+        """Load all allowed chats from the database. Should be called once at startup."""
+        data = await self._db.get_all_data_in_collection()
+
+        if data is None:
+            _log.getLogger().error("Failed to load allowed chats, falling back to lazy loading")
+            return False
+
+        self._chats = {
+            chat["chat_id"]: bool(chat.get("automoderation", False))
+            for chat in data if "chat_id" in chat
+        }
+        self._is_loaded = True
+
+        _log.getLogger().debug(f"Loaded {len(self._chats)} allowed chats into the registry")
+        return True
+
+    async def _get_entry(self, chat_id: int) -> bool | None:
+        if chat_id in self._chats:
+            return self._chats[chat_id]
+
+        if self._is_loaded:
+            self._chats[chat_id] = _NOT_ALLOWED
+            return _NOT_ALLOWED
+
+        # The startup load has failed, so look the chat up once and remember the result
+        data = await self._db.find_data_in_collection_by({"chat_id": chat_id})
+        if data is None:
+            return _NOT_ALLOWED
+
+        entry = bool(data[-1].get("automoderation", False)) if data else _NOT_ALLOWED
+        self._chats[chat_id] = entry
+        return entry
+
+    async def is_allowed(self, chat_id: int) -> bool:
+        return await self._get_entry(chat_id) is not _NOT_ALLOWED
+
+    async def get_automod_status(self, chat_id: int) -> bool | None:
+        """Return the automoderation flag of the chat or None if the chat is not allowed."""
+        return await self._get_entry(chat_id)
+
+    def set_chat(self, chat_id: int, automoderation: bool = False):
+        """Write-through hook for a chat that was added to 'allowed-chats'."""
+        self._chats[chat_id] = bool(automoderation)
+        _log.getLogger().debug(f"Chat {chat_id} is allowed in the registry (automoderation: {automoderation})")
+
+    def set_automoderation(self, chat_id: int, automoderation: bool):
+        """Write-through hook for a changed automoderation flag."""
+        self.set_chat(chat_id, automoderation)
+
+    def remove_chat(self, chat_id: int):
+        """Write-through hook for a chat that was removed from 'allowed-chats'."""
+        self._chats[chat_id] = _NOT_ALLOWED
+        _log.getLogger().debug(f"Chat {chat_id} is disallowed in the registry")
+
+    def is_loaded(self) -> bool:
+        return self._is_loaded
+
+chat_registry = ChatRegistry()
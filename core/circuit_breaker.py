@@ -0,0 +1,111 @@
+from enum import Enum
+from time import monotonic
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("CircuitBreaker")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """The call was not made because the circuit is open."""
+
+class CircuitBreaker:
+    """Stops calling a failing dependency and probes it until it recovers.
+
+    The circuit opens after failure_threshold consecutive failures, where a call slower than
+    the latency SLO counts as a failure too. While it is open calls fail fast with
+    CircuitOpenError. After reset_timeout one probe call is let through (half-open): a
+    success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, latency_slo: float | None = None):
+        """Initialize the breaker.
+        :param name: The dependency name used in logs.
+        :param failure_threshold: The number of consecutive failures or SLO breaches that opens the circuit.
+        :param reset_timeout: How long the circuit stays open before a probe, in seconds.
+        :param latency_slo: The latency of a successful call that counts as a breach, in seconds.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_slo = latency_slo
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def is_open(self) -> bool:
+        """Whether calls would fail fast right now. Doesn't start a probe."""
+        if self._state == CircuitState.OPEN:
+            return monotonic() - self._opened_at < self.reset_timeout
+        return self._state == CircuitState.HALF_OPEN and self._probing
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be made, start a probe if it is time to."""
+        if self._state == CircuitState.OPEN and monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._probing = False
+            _log.getLogger().info(f"Circuit '{self.name}' is half-open, probing")
+
+        if self._state == CircuitState.OPEN or (self._state == CircuitState.HALF_OPEN and self._probing):
+            self._rejected += 1
+            raise CircuitOpenError(f"'{self.name}' is unavailable")
+
+        if self._state == CircuitState.HALF_OPEN:
+            self._probing = True
+
+    def abort_call(self):
+        """The call was cancelled before it finished, let another probe through if it was one."""
+        if self._state == CircuitState.HALF_OPEN:
+            self._probing = False
+
+    def record_success(self, latency: float):
+        if self.latency_slo is not None and latency > self.latency_slo:
+            _log.getLogger().warning(f"Call to '{self.name}' took {latency:.2f} s, over the {self.latency_slo} s SLO")
+            self.record_failure()
+            return
+
+        if self._state != CircuitState.CLOSED:
+            _log.getLogger().info(f"Circuit '{self.name}' is closed again")
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        if self._state != CircuitState.OPEN:
+            self._opened += 1
+            _log.getLogger().warning(f"Circuit '{self.name}' is open after {self._failures} failures, retrying in {self.reset_timeout} s")
+
+        self._state = CircuitState.OPEN
+        self._opened_at = monotonic()
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self._state.value,
+            "consecutive_failures": self._failures,
+            "opened": self._opened,
+            "rejected": self._rejected
+        }
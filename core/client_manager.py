@@ -4,6 +4,9 @@ from utils.path_manager import get_session_path
 
 from config.config import get_data
 from .handler_manager import register_handlers
+from .db_manager import close_db_clients
+from handlers.public._detection import detection_executor
+from handlers.public._behavior_manager import pattern_store
 
 clients = {}
 
@@ -22,4 +25,8 @@ async def start_new_session(session_name: str):
 
 async def stop_all_clients():
     for client in clients.values():
-        await client.stop()
\ No newline at end of file
+        await client.stop()
+
+    pattern_store.stop()
+    await close_db_clients()
+    detection_executor.shutdown()
\ No newline at end of file
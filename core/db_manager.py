@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pymongo.asynchronous.mongo_client import AsyncMongoClient
 from pymongo.server_api import ServerApi
 
@@ -6,18 +8,77 @@ from bson.objectid import ObjectId
 from config.config import get_mongodb_uri
 
 from logger import Log
-from constants import STANDARD_LOG_LEVEL
+from constants import STANDARD_LOG_LEVEL, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS
 
 _log = Log("DBManager")
 _log.getLogger().setLevel(STANDARD_LOG_LEVEL)
 _log.write_logs_to_file()
 
-# Create a new client and connect to the server
+class MongoClientRegistry:
+    """A process-wide registry that keeps one pooled AsyncMongoClient per URI."""
+
+    def __init__(self, max_pool_size: int = MONGO_MAX_POOL_SIZE, min_pool_size: int = MONGO_MIN_POOL_SIZE, max_idle_time_ms: int = MONGO_MAX_IDLE_TIME_MS):
+        """Initialize the registry with the connection pool settings.
+        :param max_pool_size: The maximum number of connections per client.
+        :param min_pool_size: The number of connections kept open while idle.
+        :param max_idle_time_ms: How long a pooled connection may stay idle before it is closed.
+        """
+        self._clients: Dict[str, AsyncMongoClient] = {}
+        self._default_uri = None
+
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.max_idle_time_ms = max_idle_time_ms
+
+    def get_client(self, uri: str = None) -> AsyncMongoClient:
+        """Return the shared client for the URI, creating it on first use.
+        :param uri: The MongoDB connection string. The URI from the config is used if it is not specified.
+        """
+        if uri is None:
+            if self._default_uri is None:
+                self._default_uri = get_mongodb_uri()
+            uri = self._default_uri
+
+        client = self._clients.get(uri)
+        if client is None:
+            _log.getLogger().debug(f"Creating a pooled MongoDB client (max pool size: {self.max_pool_size}, max idle time: {self.max_idle_time_ms} ms)")
+            client = AsyncMongoClient(
+                uri,
+                server_api=ServerApi('1'),
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                maxIdleTimeMS=self.max_idle_time_ms
+            )
+            self._clients[uri] = client
+
+        return client
+
+    async def close_all(self):
+        """Close every pooled client. The next get_client() call creates a new one."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                _log.getLogger().error(f"Something was happened in MongoClientRegistry.close_all(): {e}")
+
+        _log.getLogger().debug(f"Closed {len(clients)} pooled MongoDB client(s)")
+
+    def get_clients_count(self) -> int:
+        return len(self._clients)
+
+mongo_clients = MongoClientRegistry()
+
+async def close_db_clients():
+    await mongo_clients.close_all()
+
+# Borrow a pooled client from the registry instead of connecting on every instance
 class DBManager:
 
-    def __init__(self, db_name: str, collection_name: str = None):
-        uri = get_mongodb_uri()
-        self.client = AsyncMongoClient(uri, server_api=ServerApi('1'))
+    def __init__(self, db_name: str, collection_name: str = None, uri: str = None):
+        self.client = mongo_clients.get_client(uri)
 
         self.db = self.client[db_name]
         self.collection = self.db[collection_name]
@@ -106,10 +167,10 @@ class DBManager:
             _log.getLogger().error(f"Something was happened in db_manager.delete_one_data(): {e}")
             print(e)
 
-    async def find_data_in_collection_by(self, find_by: dict) -> list:
+    async def find_data_in_collection_by(self, find_by: dict, projection: dict = None) -> list:
         try:
             _log.getLogger().debug(f"Find data in the '{self.collection.name}' collection by '{find_by}'")
-            data = [d async for d in self.collection.find(find_by)]
+            data = [d async for d in self.collection.find(find_by, projection)]
 
             if data is None:
                 _log.getLogger().error(f"No data in this collection by '{find_by}'")
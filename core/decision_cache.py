@@ -0,0 +1,86 @@
+import hashlib
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from core.cache import AsyncTTLCache
+from handlers.public._actions import ModDecision
+from handlers.public._normalizer import canonicalize
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, DECISION_CACHE_MAX_SIZE, DECISION_CACHE_TTL, DECISION_CACHE_MIN_CONFIDENCE
+
+_log = Log("DecisionCache")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class DecisionCache:
+    """AI moderation decisions keyed by the content hash of the trigger text and the detection method.
+
+    Spam waves repeat the same text from many accounts. Only confident decisions are stored, so
+    a repeat reuses the verdict without building the context or calling the model, and repeats
+    that arrive while the first call is still running wait for it instead of starting their own.
+    """
+
+    def __init__(self, max_size: int = DECISION_CACHE_MAX_SIZE, ttl: float = DECISION_CACHE_TTL, min_confidence: float = DECISION_CACHE_MIN_CONFIDENCE):
+        """Initialize the cache.
+        :param max_size: The maximum number of cached decisions.
+        :param ttl: Time to live of a cached decision in seconds.
+        :param min_confidence: The minimum confidence of a decision to be cached.
+        """
+        self.min_confidence = min_confidence
+        self._decisions = AsyncTTLCache("ai_decisions", max_size, ttl)
+
+        self._model_calls = 0
+        self._model_seconds = 0.0
+        self._saved_calls = 0
+
+    @staticmethod
+    def make_key(text: str | None, method: str) -> str:
+        """Hash the canonical text, so case, homoglyph and spacing variations of a spam text share a key."""
+        canonical = " ".join(canonicalize(text or "").split())
+        return hashlib.sha256(f"{method}\x00{canonical}".encode("utf-8")).hexdigest()
+
+    def _is_cacheable(self, decision: ModDecision | None) -> bool:
+        return decision is not None and decision.confidence >= self.min_confidence
+
+    async def get_or_decide(self, text: str | None, method: str, decide: Callable[[], Awaitable[ModDecision]]) -> ModDecision:
+        """Return the cached decision for the text or ask the model through decide().
+        :param text: The text of the message that triggered the detection.
+        :param method: The detection method.
+        :param decide: A coroutine function that builds the context and calls the model.
+        """
+        called = False
+
+        async def load() -> ModDecision:
+            nonlocal called
+            called = True
+
+            started = perf_counter()
+            try:
+                return await decide()
+            finally:
+                self._model_calls += 1
+                self._model_seconds += perf_counter() - started
+
+        decision = await self._decisions.get_or_load(self.make_key(text, method), load, cache_if=self._is_cacheable)
+
+        if not called:
+            self._saved_calls += 1
+            _log.getLogger().debug(f"Reused the cached decision {decision.action.name} ({decision.confidence}) for method {method}")
+
+        return decision
+
+    def stats(self) -> dict:
+        stats = self._decisions.stats()
+        average = self._model_seconds / self._model_calls if self._model_calls else 0.0
+
+        stats["model_calls"] = self._model_calls
+        stats["avg_model_latency_s"] = average
+        stats["saved_calls"] = self._saved_calls
+        stats["saved_latency_s"] = self._saved_calls * average
+
+        return stats
+
+    def log_stats(self):
+        _log.getLogger().debug(f"Decision cache stats: {self.stats()}")
+
+decision_cache = DecisionCache()
@@ -0,0 +1,136 @@
+from typing import Callable, Dict
+
+from handlers.public._actions import ModDecision, ModAction
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("DecisionStream")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+# The fields that make a decision actionable, the prompts ask for them before the prose
+_REQUIRED_FIELDS = ("ACTION", "CONFIDENCE")
+# A mute without its duration would be applied as a permanent one
+_REQUIRED_FIELDS_BY_ACTION = {ModAction.MUTE.value: ("DURATION",)}
+
+def build_decision(fields: Dict[str, str]) -> ModDecision:
+    """Build a decision from the parsed 'KEY: value' fields. Raises ValueError on invalid values."""
+    try:
+        return ModDecision(
+            action=ModAction(fields.get("ACTION", "none")),
+            reason=fields.get("REASON", "No reason provided"),
+            duration=int(fields.get("DURATION", 0)),
+            warning_text=fields.get("WARNING"),
+            confidence=float(fields.get("CONFIDENCE", 0.0))
+        )
+    except Exception as e:
+        _log.getLogger().error(f"Error parsing response: {str(e)}")
+        raise ValueError("Invalid response format from AI model")
+
+class _Block:
+    __slots__ = ("fields", "decision")
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.decision: ModDecision | None = None
+
+class DecisionStreamParser:
+    """Parses model decisions line by line while the response is still streaming.
+
+    A response holds one decision, or one block per message id starting with an 'ID: <id>' line.
+    As soon as a block has its ACTION and CONFIDENCE (and DURATION for a mute) the decision is
+    built and passed to on_decision, so the action can be applied before the model finishes the
+    reason. The fields that arrive later (REASON, WARNING) are written into the same ModDecision
+    object. A block that never becomes actionable is built from all its fields on close().
+    """
+
+    def __init__(self, on_decision: Callable[[int | None, ModDecision], None] | None = None):
+        """Initialize the parser.
+        :param on_decision: Called once per block with its message id (None outside 'ID:' blocks) and its early decision.
+        """
+        self._on_decision = on_decision
+        self._buffer = ""
+        self._blocks: Dict[int | None, _Block] = {}
+        self._current: int | None = None
+        self._skip_block = False
+
+    def feed(self, chunk: str):
+        """Feed a piece of the response, complete lines are parsed right away."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+
+        for line in lines:
+            self._parse_line(line)
+
+    def _parse_line(self, line: str):
+        if ": " not in line:
+            return
+
+        key, value = line.split(": ", 1)
+        key, value = key.strip().upper(), value.strip()
+
+        if key == "ID":
+            try:
+                self._current = int(value.split()[0])
+                self._skip_block = False
+            except (ValueError, IndexError):
+                # Fields of a block with an unreadable id can't be matched to a message
+                self._skip_block = True
+            return
+
+        if self._skip_block:
+            return
+
+        block = self._blocks.get(self._current)
+        if block is None:
+            block = self._blocks[self._current] = _Block()
+
+        block.fields[key] = value
+
+        if block.decision is not None:
+            self._update(block.decision, key, value)
+        elif self._is_actionable(block.fields):
+            try:
+                block.decision = build_decision(block.fields)
+            except ValueError:
+                return
+
+            if self._on_decision is not None:
+                self._on_decision(self._current, block.decision)
+
+    def _is_actionable(self, fields: Dict[str, str]) -> bool:
+        if not all(field in fields for field in _REQUIRED_FIELDS):
+            return False
+
+        required = _REQUIRED_FIELDS_BY_ACTION.get(fields["ACTION"].lower(), ())
+        return all(field in fields for field in required)
+
+    def _update(self, decision: ModDecision, key: str, value: str):
+        try:
+            if key == "REASON":
+                decision.reason = value
+            elif key == "WARNING":
+                decision.warning_text = value
+            elif key == "DURATION" and decision.duration in (None, 0):
+                decision.duration = int(value)
+        except ValueError:
+            _log.getLogger().debug(f"Ignoring an invalid late field {key}: {value}")
+
+    def close(self) -> Dict[int | None, ModDecision]:
+        """Parse the rest of the response and return every decision by message id."""
+        if self._buffer:
+            self._parse_line(self._buffer)
+            self._buffer = ""
+
+        decisions = {}
+        for message_id, block in self._blocks.items():
+            if block.decision is None:
+                try:
+                    block.decision = build_decision(block.fields)
+                except ValueError:
+                    _log.getLogger().error(f"Skipping an invalid decision block for message {message_id}")
+                    continue
+
+            decisions[message_id] = block.decision
+
+        return decisions
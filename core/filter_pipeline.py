@@ -0,0 +1,116 @@
+import inspect
+from time import perf_counter
+from typing import Dict, List
+
+from pyrogram.filters import Filter
+
+from enums import FilterCost
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("FilterPipeline")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+# The attribute of an update that holds the results of the stages already evaluated for it
+_MEMO_ATTR = "_filter_memo"
+
+def _get_memo(update) -> Dict[str, bool] | None:
+    memo = getattr(update, _MEMO_ATTR, None)
+    if memo is None:
+        memo = {}
+        try:
+            setattr(update, _MEMO_ATTR, memo)
+        except AttributeError:
+            return None
+    return memo
+
+class FilterStage:
+    """A named handler filter with its cost class and evaluation counters.
+
+    A stage is declared once and shared by every pipeline that uses it, so its counters cover
+    all handlers. The result is memoized on the update by stage name: pyrogram checks the same
+    update object against the handlers of every group, and the stage runs at most once for it.
+    Pyrogram leaves underscore attributes out of the update's str() and JSON.
+    """
+    __slots__ = ("name", "cost", "flt", "evaluations", "passed", "total_time", "memo_hits")
+
+    def __init__(self, name: str, cost: FilterCost, flt):
+        """Declare the stage.
+        :param name: The unique stage name used in the stats.
+        :param cost: The FilterCost of the filter.
+        :param flt: A pyrogram filter, or any callable taking (client, update) that returns a bool or an awaitable.
+        """
+        self.name = name
+        self.cost = cost
+        self.flt = flt
+
+        self.evaluations = 0
+        self.passed = 0
+        self.total_time = 0.0
+        self.memo_hits = 0
+
+    async def evaluate(self, client, update) -> bool:
+        memo = _get_memo(update)
+        if memo is not None and self.name in memo:
+            self.memo_hits += 1
+            return memo[self.name]
+
+        start = perf_counter()
+        try:
+            result = self.flt(client, update)
+            if inspect.isawaitable(result):
+                result = await result
+        finally:
+            self.evaluations += 1
+            self.total_time += perf_counter() - start
+
+        result = bool(result)
+        if result:
+            self.passed += 1
+        if memo is not None:
+            memo[self.name] = result
+        return result
+
+class FilterPipeline(Filter):
+    """A handler filter made of stages evaluated cheapest first.
+
+    Stages are sorted by cost class once, keeping the declared order within a class, and the
+    evaluation stops at the first stage that rejects the update. So the database and API
+    filters only run for the updates that passed every cheap check.
+    """
+
+    def __init__(self, *stages: FilterStage):
+        self.stages: List[FilterStage] = sorted(stages, key=lambda stage: stage.cost)
+
+        for stage in self.stages:
+            _registry.setdefault(stage.name, stage)
+
+    async def __call__(self, client, update) -> bool:
+        for stage in self.stages:
+            if not await stage.evaluate(client, update):
+                return False
+        return True
+
+    def __repr__(self) -> str:
+        return f"FilterPipeline({', '.join(stage.name for stage in self.stages)})"
+
+# Every stage used by a pipeline, by name
+_registry: Dict[str, FilterStage] = {}
+
+def pipeline(*stages: FilterStage) -> FilterPipeline:
+    """Combine the stages into one cost-ordered handler filter."""
+    return FilterPipeline(*stages)
+
+def get_stats() -> dict:
+    """Evaluation counts and timings of every stage, in evaluation order."""
+    return {
+        stage.name: {
+            "cost": stage.cost.name,
+            "evaluations": stage.evaluations,
+            "passed": stage.passed,
+            "saved_evaluations": stage.memo_hits,
+            "avg_time_ms": stage.total_time / stage.evaluations * 1000 if stage.evaluations else 0.0
+        }
+        for stage in sorted(_registry.values(), key=lambda stage: stage.cost)
+    }
@@ -1,21 +1,46 @@
-from pyrogram import filters
-from pyrogram.handlers import MessageHandler
+from pyrogram.handlers import MessageHandler, ChatMemberUpdatedHandler
 
 from handlers.filters import *
 from enums import CommandAccessLevel
 
+from .admin_roster import admin_roster
+from .chat_registry import chat_registry
+from .trusted_registry import trusted_registry
+from .message_buffer import message_buffer
+from .recent_joins import recent_joins
+from .filter_pipeline import pipeline, get_stats as get_filter_stats
+from .stats_reporter import stats_reporter
+from .decision_cache import decision_cache
+from .ai_scheduler import ai_scheduler
+from .ai_manager import ai_breaker
+from . import api_cache
+
 async def register_handlers(client):
     from handlers.user import test
     from handlers.user import type
     from handlers.user import flip
 
     from handlers.public import group_commands
+    from handlers.public._behavior_manager import pattern_store
+    from handlers.public._banned_words import banned_word_store
+    from handlers.public._flood_detector import flood_detector
+    from handlers.public._detection import detection_executor
+    from handlers.public._spam_clusters import spam_clusters
 
     from handlers.admin.group import access, blocked_users, trusted_users, automoderation
     from handlers.public.group import message, user
 
     from .plugin._initializer import _PluginCommandInializer
 
+    # ---- Load in-memory registries used by the filters ----
+    await chat_registry.load()
+    await trusted_registry.load()
+    await banned_word_store.load()
+
+    # ---- Load banned behaviors and keep them fresh in the background ----
+    await pattern_store.refresh()
+    pattern_store.start()
+
     # ---- Initialize command register and group commands ----
     command_register = _PluginCommandInializer()
 
@@ -23,28 +48,62 @@ async def register_handlers(client):
     trusted_user = trusted_users.TrustedUsers(client)
     automod_handler = automoderation.AutoModerationHandler(client)
 
+    # ---- Log the stats periodically ----
+    stats_reporter.register("Filter pipeline", get_filter_stats)
+    stats_reporter.register("API cache", api_cache.get_stats)
+    stats_reporter.register("Admin roster", admin_roster.stats)
+    stats_reporter.register("Recent joins", recent_joins.stats)
+    stats_reporter.register("Message buffer", message_buffer.stats)
+    stats_reporter.register("Flood detector", flood_detector.stats)
+    stats_reporter.register("Detection", detection_executor.stats)
+    stats_reporter.register("Banned words", banned_word_store.stats)
+    stats_reporter.register("Spam clusters", spam_clusters.stats)
+    stats_reporter.register("Decision cache", decision_cache.stats)
+    stats_reporter.register("AI batcher", commands_group.ai_batcher.stats)
+    stats_reporter.register("AI scheduler", ai_scheduler.stats)
+    stats_reporter.register("AI circuit breaker", ai_breaker.stats)
+    stats_reporter.start()
+
     # ----------------- Register all handlers -----------------
     command_register._register_handlers(client)
 
     # ----------------- REGISTER USER COMMANDS -----------------
-    client.add_handler(MessageHandler(test.test, filters.command("test", prefixes=".") & filters.me & check_access_control(CommandAccessLevel.PRIVATE)))
-    client.add_handler(MessageHandler(type.type, filters.command("type", prefixes=".") & filters.me & check_access_control(CommandAccessLevel.USER)))
-    client.add_handler(MessageHandler(flip.flip, filters.command("flip", prefixes=".") & filters.me & check_access_control(CommandAccessLevel.USER)))
+    # Each pipeline evaluates its filters cheapest first and stops at the first one that fails
+    client.add_handler(MessageHandler(test.test, pipeline(command_stage("test"), me_stage, access_stage(CommandAccessLevel.PRIVATE))))
+    client.add_handler(MessageHandler(type.type, pipeline(command_stage("type"), me_stage, access_stage(CommandAccessLevel.USER))))
+    client.add_handler(MessageHandler(flip.flip, pipeline(command_stage("flip"), me_stage, access_stage(CommandAccessLevel.USER))))
 
     # ------------- REGISTER GROUP PUBLIC COMMANDS -------------
-    client.add_handler(MessageHandler(message.message_data, filters.command("messageinfo", prefixes=".") & is_chat_allowed & check_access_control(CommandAccessLevel.PUBLIC)))
-    client.add_handler(MessageHandler(user.user_info, filters.command("userinfo", prefixes=".") & is_chat_allowed & check_access_control(CommandAccessLevel.PUBLIC)))
+    client.add_handler(MessageHandler(message.message_data, pipeline(command_stage("messageinfo"), chat_allowed_stage, access_stage(CommandAccessLevel.PUBLIC))))
+    client.add_handler(MessageHandler(user.user_info, pipeline(command_stage("userinfo"), chat_allowed_stage, access_stage(CommandAccessLevel.PUBLIC))))
 
     # ------------- REGISTER ADMIN PUBLIC COMMANDS -------------
-    client.add_handler(MessageHandler(access.allow_chat, filters.command("allow", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_admin))
-    client.add_handler(MessageHandler(access.disallow_chat, filters.command("disallow", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_admin))
-    client.add_handler(MessageHandler(blocked_users.get_blocked_users, filters.command("get_blocked", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_chat_allowed & is_admin))
+    client.add_handler(MessageHandler(access.allow_chat, pipeline(command_stage("allow"), access_stage(CommandAccessLevel.PUBLIC), admin_stage)))
+    client.add_handler(MessageHandler(access.disallow_chat, pipeline(command_stage("disallow"), access_stage(CommandAccessLevel.PUBLIC), admin_stage)))
+    client.add_handler(MessageHandler(blocked_users.get_blocked_users, pipeline(command_stage("get_blocked"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+
+    client.add_handler(MessageHandler(trusted_user.add_trusted_user, pipeline(command_stage("add_trusted"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+    client.add_handler(MessageHandler(trusted_user.remove_trusted_user, pipeline(command_stage("remove_trusted"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+    # client.add_handler(MessageHandler(trusted_users.list_trusted_users, pipeline(command_stage("list_trusted"), access_stage(CommandAccessLevel.PRIVATE), admin_stage, chat_allowed_stage)))
+
+    client.add_handler(MessageHandler(commands_group.restrict_process, pipeline(command_stage("Modxnn", prefixes="@"), chat_allowed_stage)))
+
+    client.add_handler(MessageHandler(automod_handler.set_automoderation, pipeline(command_stage("automod"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+    client.add_handler(MessageHandler(automod_handler.ban_word, pipeline(command_stage("banword"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+    client.add_handler(MessageHandler(automod_handler.unban_word, pipeline(command_stage("unbanword"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+    client.add_handler(MessageHandler(automod_handler.list_banned_words, pipeline(command_stage("banwords"), access_stage(CommandAccessLevel.PUBLIC), chat_allowed_stage, admin_stage)))
+
+    # Service messages have nothing to moderate. Media without text still goes through, the flood
+    # detector counts it, and autorestrict_process skips the content analysis for it
+    client.add_handler(MessageHandler(commands_group.autorestrict_process, pipeline(not_service_stage, chat_allowed_stage, automod_enabled_stage)))
 
-    client.add_handler(MessageHandler(trusted_user.add_trusted_user, filters.command("add_trusted", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_chat_allowed & is_admin))
-    client.add_handler(MessageHandler(trusted_user.remove_trusted_user, filters.command("remove_trusted", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_chat_allowed & is_admin))
-    # client.add_handler(MessageHandler(trusted_users.list_trusted_users, filters.command("list_trusted", prefixes=".") & check_access_control(CommandAccessLevel.PRIVATE) & is_admin & is_chat_allowed))
+    # ------------- BUFFER RECENT MESSAGES FOR THE AI CONTEXT -------------
+    # Group -1 runs before the moderation handlers, so the flagged message is already in the buffer
+    client.add_handler(MessageHandler(message_buffer.on_message, pipeline(group_stage, text_stage, chat_allowed_stage, automod_enabled_stage)), group=-1)
 
-    client.add_handler(MessageHandler(commands_group.restrict_process, filters.command("Modxnn", prefixes="@") & is_chat_allowed))
+    # ------------- KEEP CACHED ADMIN ROSTERS IN SYNC -------------
+    client.add_handler(ChatMemberUpdatedHandler(admin_roster.on_chat_member_updated))
 
-    client.add_handler(MessageHandler(automod_handler.set_automoderation, filters.command("automod", prefixes=".") & check_access_control(CommandAccessLevel.PUBLIC) & is_chat_allowed & is_admin))
-    client.add_handler(MessageHandler(commands_group.autorestrict_process, is_chat_allowed & is_automod_enabled))
+    # ------------- TRACK RECENTLY JOINED MEMBERS FOR THE AI PRIORITY -------------
+    # Only the first matching handler of a group runs, so it gets a group of its own
+    client.add_handler(ChatMemberUpdatedHandler(recent_joins.on_chat_member_updated), group=1)
@@ -0,0 +1,148 @@
+import sys
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import Deque, List
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, MESSAGE_BUFFER_SIZE, MESSAGE_BUFFER_MAX_CHATS, MESSAGE_BUFFER_IDLE_TTL, MESSAGE_BUFFER_MAX_TEXT, MESSAGE_BUFFER_MAX_BYTES
+
+_log = Log("MessageBuffer")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class BufferedMessage:
+    """A compact copy of a chat message, only what the AI context needs."""
+    __slots__ = ("message_id", "sender_id", "sender_name", "text", "reply_to", "date")
+
+    def __init__(self, message_id: int, sender_id: int | None, sender_name: str, text: str, reply_to: str | None, date: int):
+        self.message_id = message_id
+        self.sender_id = sender_id
+        # The same few names repeat across thousands of records, keep one copy of each
+        self.sender_name = sys.intern(sender_name)
+        self.text = text
+        self.reply_to = reply_to
+        self.date = date  # Unix timestamp
+
+    @classmethod
+    def from_message(cls, msg, max_text: int = MESSAGE_BUFFER_MAX_TEXT) -> "BufferedMessage":
+        sender = getattr(msg, "from_user", None) or getattr(msg, "sender_chat", None)
+        sender_name = getattr(sender, "first_name", None) or getattr(sender, "title", None) or "Unknown"
+
+        text = msg.text or msg.caption or ""
+        reply = getattr(msg, "reply_to_message", None)
+        reply_to = (reply.text or reply.caption or None) if reply is not None else None
+
+        date = getattr(msg, "date", None)
+
+        return cls(
+            msg.id,
+            getattr(sender, "id", None),
+            sender_name,
+            text[:max_text],
+            reply_to[:max_text] if reply_to else None,
+            int(date.timestamp()) if date is not None else 0
+        )
+
+    def size(self) -> int:
+        """The approximate memory taken by the record, in bytes. Interned sender names are shared and not counted."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.text) + sys.getsizeof(self.message_id) + sys.getsizeof(self.date)
+        if self.reply_to is not None:
+            size += sys.getsizeof(self.reply_to)
+        return size
+
+class _ChatBuffer:
+    __slots__ = ("messages", "last_seen", "bytes")
+
+    def __init__(self, size: int):
+        self.messages: Deque[BufferedMessage] = deque(maxlen=size)
+        self.last_seen = monotonic()
+        self.bytes = 0
+
+class ChatMessageBuffer:
+    """The last N messages of every moderated chat, recorded from the update stream.
+
+    build_context reads the context from here instead of calling get_chat_history, so a flagged
+    message costs no MTProto request. Chats are kept in LRU order of their last message: at most
+    max_chats are tracked, the records of all chats take at most max_bytes, and chats silent for
+    longer than idle_ttl are dropped as new messages arrive.
+    """
+
+    def __init__(self, size: int = MESSAGE_BUFFER_SIZE, max_chats: int = MESSAGE_BUFFER_MAX_CHATS, idle_ttl: float = MESSAGE_BUFFER_IDLE_TTL, max_bytes: int = MESSAGE_BUFFER_MAX_BYTES):
+        """Initialize the buffer.
+        :param size: The number of messages kept per chat.
+        :param max_chats: The maximum number of tracked chats.
+        :param idle_ttl: How long a chat without messages is kept, in seconds.
+        :param max_bytes: The memory budget of all buffered records, in bytes.
+        """
+        self.size = size
+        self.max_chats = max_chats
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+
+        self._chats: OrderedDict[int, _ChatBuffer] = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+
+    def record(self, msg):
+        """Add the message to its chat's buffer."""
+        chat_id = msg.chat.id
+        now = monotonic()
+
+        buffer = self._chats.get(chat_id)
+        if buffer is None:
+            buffer = self._chats[chat_id] = _ChatBuffer(self.size)
+        else:
+            self._chats.move_to_end(chat_id)
+
+        record = BufferedMessage.from_message(msg)
+        added = record.size()
+        if len(buffer.messages) == buffer.messages.maxlen:
+            # The deque drops its oldest record on append
+            added -= buffer.messages[0].size()
+
+        buffer.messages.append(record)
+        buffer.last_seen = now
+        buffer.bytes += added
+        self._bytes += added
+
+        self._evict(now)
+
+    def _evict(self, now: float):
+        # The front of the LRU order is the chat that has been silent the longest
+        # The chat that was just written to is never evicted, even if it alone is over the budget
+        while len(self._chats) > 1:
+            chat_id, buffer = next(iter(self._chats.items()))
+            if len(self._chats) <= self.max_chats and self._bytes <= self.max_bytes and now - buffer.last_seen <= self.idle_ttl:
+                break
+
+            del self._chats[chat_id]
+            self._bytes -= buffer.bytes
+            self._evictions += 1
+
+    def get_recent(self, chat_id: int, limit: int | None = None) -> List[BufferedMessage]:
+        """Return the recent messages of the chat, oldest first."""
+        buffer = self._chats.get(chat_id)
+        if buffer is None:
+            return []
+
+        messages = list(buffer.messages)
+        return messages[-limit:] if limit else messages
+
+    async def on_message(self, client, msg):
+        """Handler for every message of a moderated chat, registered in a group before the moderation handlers."""
+        try:
+            self.record(msg)
+        except Exception as e:
+            _log.getLogger().error(f"Failed to record message {getattr(msg, 'id', None)}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "max_chats": self.max_chats,
+            "messages": sum(len(buffer.messages) for buffer in self._chats.values()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self._evictions
+        }
+
+message_buffer = ChatMessageBuffer()
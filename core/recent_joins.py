@@ -0,0 +1,46 @@
+from pyrogram.enums import ChatMemberStatus
+
+from core.cache import AsyncTTLCache
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, AI_NEW_MEMBER_PERIOD, RECENT_JOINS_MAX_SIZE
+
+_log = Log("RecentJoins")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_ABSENT_STATUSES = (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED)
+
+class RecentJoins:
+    """Members who joined a chat within the new member period, recorded from ChatMemberUpdated updates.
+
+    Telling a new member apart costs a dict lookup instead of a get_chat_member request. A member
+    who joined before the bot started, or in a chat that sends no member updates, counts as an old one.
+    """
+
+    def __init__(self, period: float = AI_NEW_MEMBER_PERIOD, max_size: int = RECENT_JOINS_MAX_SIZE):
+        """Initialize the registry.
+        :param period: How long a member counts as new after joining, in seconds.
+        :param max_size: The maximum number of tracked members, the oldest joins are dropped first.
+        """
+        self._joins = AsyncTTLCache("recent_joins", max_size, period)
+
+    def is_new(self, chat_id: int, user_id: int) -> bool:
+        return self._joins.get((chat_id, user_id), False)
+
+    async def on_chat_member_updated(self, client, update):
+        """ChatMemberUpdated handler that records the members who have just joined."""
+        new_member = update.new_chat_member
+        if new_member is None or new_member.user is None or new_member.status in _ABSENT_STATUSES:
+            return
+
+        old_member = update.old_chat_member
+        if old_member is not None and old_member.status not in _ABSENT_STATUSES:
+            return
+
+        self._joins.set((update.chat.id, new_member.user.id), True)
+        _log.getLogger().debug(f"User {new_member.user.id} joined chat {update.chat.id}")
+
+    def stats(self) -> dict:
+        return self._joins.stats()
+
+recent_joins = RecentJoins()
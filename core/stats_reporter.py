@@ -0,0 +1,47 @@
+import asyncio
+from typing import Callable, Dict
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, STATS_LOG_INTERVAL
+
+_log = Log("Stats")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class StatsReporter:
+    """Logs the stats of the registered components at a fixed interval, at debug level."""
+
+    def __init__(self, interval: float = STATS_LOG_INTERVAL):
+        """Initialize the reporter.
+        :param interval: Seconds between two reports.
+        """
+        self._interval = interval
+        self._sources: Dict[str, Callable[[], dict]] = {}
+        self._report_task: asyncio.Task | None = None
+
+    def register(self, name: str, stats: Callable[[], dict]):
+        self._sources[name] = stats
+
+    def log_stats(self):
+        for name, stats in self._sources.items():
+            try:
+                _log.getLogger().debug(f"{name} stats: {stats()}")
+            except Exception as e:
+                _log.getLogger().error(f"Failed to collect the stats of {name}: {e}")
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            self.log_stats()
+
+    def start(self):
+        """Start the background reporter."""
+        if self._report_task is None or self._report_task.done():
+            self._report_task = asyncio.create_task(self._report_loop())
+
+    def stop(self):
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
+
+stats_reporter = StatsReporter()
@@ -0,0 +1,75 @@
+import math
+from typing import List
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, AI_TOKENIZER_ENCODING, AI_CHARS_PER_TOKEN
+
+_log = Log("TokenBudget")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+_encoding_failed = False
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+
+    if _encoding is None and not _encoding_failed:
+        if tiktoken is None:
+            _encoding_failed = True
+            _log.getLogger().debug("tiktoken is not installed, estimating tokens by text length")
+        else:
+            try:
+                _encoding = tiktoken.get_encoding(AI_TOKENIZER_ENCODING)
+            except Exception as e:
+                _encoding_failed = True
+                _log.getLogger().warning(f"Failed to load the '{AI_TOKENIZER_ENCODING}' encoding, estimating tokens by text length: {e}")
+
+    return _encoding
+
+def estimate_tokens(text: str) -> int:
+    """Return the number of tokens in the text, exact with tiktoken or estimated by its length otherwise."""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return math.ceil(len(text) / AI_CHARS_PER_TOKEN)
+
+def fit_lines(lines: List[str], budget: int, keep_head: int = 0, keep_tail: int = 0) -> List[str]:
+    """Drop the oldest lines until the rest fit into the token budget.
+
+    The first keep_head and last keep_tail lines (headers and footers) are always kept, the lines
+    in between are taken from the newest one backwards, so the message that triggered the
+    detection survives any trimming.
+    :param lines: The lines ordered from oldest to newest.
+    :param budget: The token budget of the joined lines.
+    :param keep_head: The number of leading lines that are always kept.
+    :param keep_tail: The number of trailing lines that are always kept.
+    """
+    head = lines[:keep_head]
+    tail = lines[len(lines) - keep_tail:] if keep_tail else []
+    body = lines[keep_head:len(lines) - keep_tail]
+
+    # Every line costs one more token for the newline joining it
+    used = sum(estimate_tokens(line) + 1 for line in head + tail)
+
+    kept = []
+    for line in reversed(body):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget and kept:
+            break
+        kept.append(line)
+        used += cost
+
+    if len(kept) < len(body):
+        _log.getLogger().debug(f"Trimmed {len(body) - len(kept)} of {len(body)} context lines to fit {budget} tokens")
+
+    return head + kept[::-1] + tail
@@ -0,0 +1,63 @@
+from typing import Dict, Set
+
+from core.db_manager import DBManager
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("TrustedRegistry")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class TrustedUserRegistry:
+    """An in-memory index of the 'trusted-users' collection: chat_id -> set of user ids."""
+
+    def __init__(self):
+        self._db = DBManager("moderator-db", "trusted-users")
+        self._trusted: Dict[int, Set[int]] = {}
+        self._is_loaded = False
+
+    async def load(self) -> bool:
+        """Load all trusted users from the database. Should be called once at startup."""
+        data = await self._db.get_all_data_in_collection()
+
+        if data is None:
+            _log.getLogger().error("Failed to load trusted users, the index is empty")
+            return False
+
+        trusted: Dict[int, Set[int]] = {}
+        for user in data:
+            if "chat_id" in user and "user_id" in user:
+                trusted.setdefault(user["chat_id"], set()).add(user["user_id"])
+
+        self._trusted = trusted
+        self._is_loaded = True
+
+        _log.getLogger().debug(f"Loaded {sum(len(users) for users in trusted.values())} trusted users in {len(trusted)} chats")
+        return True
+
+    def is_trusted(self, chat_id: int, user_id: int) -> bool:
+        users = self._trusted.get(chat_id)
+        return users is not None and user_id in users
+
+    def add(self, chat_id: int, user_id: int):
+        self._trusted.setdefault(chat_id, set()).add(user_id)
+        _log.getLogger().debug(f"User {user_id} is trusted in chat {chat_id}")
+
+    def remove(self, chat_id: int, user_id: int):
+        users = self._trusted.get(chat_id)
+        if users is None:
+            return
+
+        users.discard(user_id)
+        if not users:
+            del self._trusted[chat_id]
+
+        _log.getLogger().debug(f"User {user_id} is no longer trusted in chat {chat_id}")
+
+    def clear_chat(self, chat_id: int):
+        self._trusted.pop(chat_id, None)
+
+    def is_loaded(self) -> bool:
+        return self._is_loaded
+
+trusted_registry = TrustedUserRegistry()
@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 class CommandAccessLevel(Enum):
     USER = "user"
@@ -7,4 +7,16 @@ class CommandAccessLevel(Enum):
 
 class ModerationMode(Enum):
     TOXICITY = "toxicity"
-    ADS = "ads"
\ No newline at end of file
+    ADS = "ads"
+
+class AIPriority(IntEnum):
+    """Order of flagged messages waiting for the model, lower values go first."""
+    BAN_CANDIDATE = 0
+    NEW_USER = 1
+    NORMAL = 2
+
+class FilterCost(IntEnum):
+    """How expensive a handler filter is, cheaper filters are evaluated first."""
+    STATIC = 0  # Reads the update only
+    MEMORY = 1  # Reads in-memory registries and caches, rarely falls back to the database
+    IO = 2  # May read files, the database or the Telegram API
@@ -1,7 +1,9 @@
 from pyrogram.enums import ChatType
 
 from handlers.admin.group._data_pattern import AllowChat
+from core import api_cache
 from core.db_manager import DBManager
+from core.chat_registry import chat_registry
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
@@ -15,7 +17,7 @@ async def allow_chat(client, msg):
     allow_chat_data = AllowChat()
 
     try:
-        chat = await client.get_chat(msg.chat.id)
+        chat = await api_cache.get_chat(client, msg.chat.id)
         allow_chat = allow_chat_data.to_dict(chat)
         data = await db.find_data_in_collection_by({"chat_id": msg.chat.id})
 
@@ -33,6 +35,7 @@ async def allow_chat(client, msg):
         
         result = await db.insert_one_data(allow_chat)
         if result:
+            chat_registry.set_chat(msg.chat.id, allow_chat["automoderation"])
             _log.getLogger().debug(f"Chat {chat.title} ({chat.id}) added to allowed chats.")
             await client.edit_message_text(msg.chat.id, msg.id, "Чат успешно добавлен в список разрешенных.")
     except Exception as e:
@@ -40,7 +43,7 @@ async def allow_chat(client, msg):
 
 async def disallow_chat(client, msg):
     try:
-        chat = await client.get_chat(msg.chat.id)
+        chat = await api_cache.get_chat(client, msg.chat.id)
         data = await db.find_data_in_collection_by({"chat_id": msg.chat.id})
 
         if not data:
@@ -49,6 +52,7 @@ async def disallow_chat(client, msg):
         
         result = await db.delete_one_data({"chat_id": msg.chat.id})
         if result:
+            chat_registry.remove_chat(msg.chat.id)
             _log.getLogger().debug(f"Chat {chat.title} ({chat.id}) removed from allowed chats.")
             await client.edit_message_text(msg.chat.id, msg.id, "Чат успешно удален из списка разрешенных.")
     except Exception as e:
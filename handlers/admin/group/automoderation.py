@@ -1,4 +1,6 @@
-from core.db_manager import DBManager
+from core.chat_registry import chat_registry
+from handlers.public._banned_words import banned_word_store
+from handlers.public._normalizer import NormalizedText, normalize_text
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
@@ -8,8 +10,6 @@ _log = Log("AutoModerationHandler")
 _log.getLogger().setLevel(STANDARD_LOG_LEVEL)
 _log.write_logs_to_file()
 
-banned_words = DBManager("moderator-db", "banned-words")
-
 class AutoModerationHandler:
     def __init__(self, client):
         """Initialize the AutoModerationHandler with a client instance.
@@ -36,6 +36,7 @@ class AutoModerationHandler:
                 _log.getLogger().debug(f"Chat {chat_id} not found in database, initializing automod status.")
                 automod_status = False
                 await db.insert_one_data({"chat_id": chat_id, "automoderation": automod_status})
+                chat_registry.set_chat(chat_id, automod_status)
             
             if orig_msg.lower() in ["off", "disable", "false"]:
                 if not automod_status:
@@ -47,6 +48,7 @@ class AutoModerationHandler:
                     data = await db.update_one_data({"chat_id": chat_id}, {"$set": {"automoderation": False}})
 
                     if data:
+                        chat_registry.set_automoderation(chat_id, False)
                         await self.client.send_message(chat_id, "Automatic moderation has been disabled.")
                         _log.getLogger().info(f"Automatic moderation disabled for chat {chat_id}.")
             elif orig_msg.lower() in ["on", "enable", "true"]:
@@ -59,6 +61,7 @@ class AutoModerationHandler:
                     data = await db.update_one_data({"chat_id": chat_id}, {"$set": {"automoderation": True}})
 
                     if data:
+                        chat_registry.set_automoderation(chat_id, True)
                         await self.client.send_message(chat_id, "Automatic moderation has been enabled.")
                         _log.getLogger().info(f"Automatic moderation enabled for chat {chat_id}.")
             else:
@@ -69,25 +72,74 @@ class AutoModerationHandler:
             _log.getLogger().error(f"Error in set_automoderation: {e}")
             await self.client.send_message(chat_id, f"Something went wrong: {e}")
     
-    async def handle_automod(self, msg):
-        """Handle automatic moderation actions based on message content."""
+    async def handle_automod(self, msg, normalized: NormalizedText | None = None) -> bool:
+        """Delete the message if it contains a banned word of the chat. Returns True if it was deleted."""
         try:
-            if not msg.text:
+            text = msg.text or msg.caption
+            if not text:
                 _log.getLogger().debug("Message has no text, skipping automod.")
-                return
-            
-            # Example of checking for banned words
-            banned_words = await db.get_banned_words(msg.chat.id)
-            if any(word in msg.text.lower() for word in banned_words):
+                return False
+
+            match = await banned_word_store.find(msg.chat.id, normalized or normalize_text(text))
+            if match is not None:
                 await self.client.delete_messages(msg.chat.id, msg.id)
-                _log.getLogger().info(f"Deleted message {msg.id} for containing banned words.")
-                return
-            
+                _log.getLogger().info(f"Deleted message {msg.id} for containing the banned word '{match.pattern['word']}'.")
+                return True
+
             # Additional automod checks can be added here
-            
+
         except Exception as e:
             _log.getLogger().error(f"Error in handle_automod: {e}")
 
+        return False
+
+    async def ban_word(self, _, msg):
+        """Add a word to the banned words of the chat."""
+        word = msg.text.split(".banword", 1)[-1].strip().lower()
+        if not word:
+            await self.client.send_message(msg.chat.id, "Please specify the word to ban: '.banword <word>'.")
+            return
+
+        try:
+            if await banned_word_store.add_word(msg.chat.id, word):
+                _log.getLogger().info(f"Word '{word}' banned in chat {msg.chat.id}.")
+                await self.client.send_message(msg.chat.id, f"The word '{word}' has been banned.")
+            else:
+                await self.client.send_message(msg.chat.id, f"Failed to ban the word '{word}'.")
+        except Exception as e:
+            _log.getLogger().error(f"Error in ban_word: {e}")
+            await self.client.send_message(msg.chat.id, f"Something went wrong: {e}")
+
+    async def unban_word(self, _, msg):
+        """Remove a word from the banned words of the chat."""
+        word = msg.text.split(".unbanword", 1)[-1].strip().lower()
+        if not word:
+            await self.client.send_message(msg.chat.id, "Please specify the word to unban: '.unbanword <word>'.")
+            return
+
+        try:
+            if await banned_word_store.remove_word(msg.chat.id, word):
+                _log.getLogger().info(f"Word '{word}' unbanned in chat {msg.chat.id}.")
+                await self.client.send_message(msg.chat.id, f"The word '{word}' is no longer banned.")
+            else:
+                await self.client.send_message(msg.chat.id, f"The word '{word}' is not banned in this chat.")
+        except Exception as e:
+            _log.getLogger().error(f"Error in unban_word: {e}")
+            await self.client.send_message(msg.chat.id, f"Something went wrong: {e}")
+
+    async def list_banned_words(self, _, msg):
+        """Send the banned words of the chat."""
+        try:
+            words = await banned_word_store.get_words(msg.chat.id)
+            if not words:
+                await self.client.send_message(msg.chat.id, "There are no banned words in this chat.")
+                return
+
+            await self.client.send_message(msg.chat.id, "Banned words:\n" + "\n".join(f"- {word}" for word in words))
+        except Exception as e:
+            _log.getLogger().error(f"Error in list_banned_words: {e}")
+            await self.client.send_message(msg.chat.id, f"Something went wrong: {e}")
+
     async def _get_automod_status(self, chat_id):
         """Retrieve the current status of automatic moderation for a chat."""
         try:
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from core.db_manager import DBManager
+from core.trusted_registry import trusted_registry
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
@@ -48,6 +49,7 @@ class TrustedUsers:
             
             result = await db.insert_one_data(data)
             if result:
+                trusted_registry.add(msg.chat.id, user_id)
                 _log.getLogger().debug(f"User {username} ({user_id}) added as trusted in chat {msg.chat.id}.")
                 await self.client.send_message(msg.chat.id, f"Пользователь {username} успешно добавлен в доверенные пользователи.")
         except Exception as e:
@@ -70,6 +72,7 @@ class TrustedUsers:
             
             result = await db.delete_one_data({"chat_id": msg.chat.id, "user_id": user_id})
             if result:
+                trusted_registry.remove(msg.chat.id, user_id)
                 _log.getLogger().debug(f"User {nickname} ({user_id}) removed from trusted users in chat {msg.chat.id}.")
                 await self.client.send_message(msg.chat.id, f"Пользователь {nickname} успешно удален из доверенных пользователей.")
         except Exception as e:
@@ -101,6 +104,7 @@ class TrustedUsers:
             
             result = await db.delete_many_data({"chat_id": msg.chat.id})
             if result:
+                trusted_registry.clear_chat(msg.chat.id)
                 _log.getLogger().debug(f"All trusted users cleared in chat {msg.chat.id}.")
                 await self.client.send_message(msg.chat.id, "Все доверенные пользователи успешно удалены.")
         except Exception as e:
@@ -1,18 +1,15 @@
-import asyncio
-from typing import Dict, Tuple
-from time import time
-
 from pyrogram import filters
-from pyrogram.enums import ChatType, ChatMemberStatus
+from pyrogram.enums import ChatType
 
-from enums import CommandAccessLevel
+from enums import CommandAccessLevel, FilterCost
 from config.config import get_owner_id
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
-from core.db_manager import DBManager
-
-from handlers.admin.group.automoderation import AutoModerationHandler
+from core.admin_roster import admin_roster
+from core.chat_registry import chat_registry
+from core.trusted_registry import trusted_registry
+from core.filter_pipeline import FilterStage
 
 DEVS = []
 
@@ -21,97 +18,18 @@ log.getLogger().setLevel(STANDARD_LOG_LEVEL)
 log.write_logs_to_file()
 
 # ----------------- Admin Control and Caching classes | BEGIN -----------------
-class AsyncAdminCache:
-
-    def __init__(self, ttl: int = 300):
-        self._cache: Dict[Tuple[int, int], Tuple[bool, float]] = {}
-        self._ttl = ttl
-        self._lock = asyncio.Lock()
-        self._cleanup_task = None
-        self._is_running = False
-
-    async def get(self, chat_id: int, user_id: int) -> bool | None:
-        async with self._lock:
-            key = (chat_id, user_id)
-            if key in self._cache:
-                is_admin, timestamp = self._cache[key]
-                if time() - timestamp < self._ttl:
-                    return is_admin
-                del self._cache[key]
-            return None
-        
-    async def set(self, chat_id: int, user_id: int, is_admin: bool):
-        async with self._lock:
-            self._cache[(chat_id, user_id)] = (is_admin, time())
-
-            if len(self._cache) == 1 and not self._is_running:
-                self._start_cleanup()
-
-    async def invalidate(self, chat_id: int, user_id: int):
-        async with self._lock:
-            key = (chat_id, user_id)
-            if key in self._cache:
-                del self._cache[key]
-
-    async def _cleanup_loop(self):
-        log.getLogger().debug("_cleanup_loop is running...")
-
-        while self._is_running and self._cache:
-            try:
-                await asyncio.sleep(90)
-                self.cleanup()
-
-                if not self._cache:
-                    self._is_running = False
-                    self._cleanup_task = None
-                    log.getLogger().debug("_cleanup_loop is stopped, because cache is empty")
-                    break
-
-            except Exception as e:
-                log.getLogger().error(f"Error in _cleanup_loop: {e}")
-                await asyncio.sleep(5)
-
-    def _start_cleanup(self):
-        if not self._start_cleanup:
-            self._start_cleanup = asyncio.create_task(self._cleanup_loop())
-
-            if self._start_cleanup:
-                self._is_running = True
-                log.getLogger().debug("_start_cleanup is running...")
-
-    def cleanup(self):
-        current_time = time()
-        expired = [
-            key for key, (_, timestamp) in self._cache.items()
-            if current_time - timestamp >= self._ttl
-        ]
-        for key in expired:
-            del self._cache[key]
-            log.getLogger().debug(f"Remove expired entry: {key}")
-
 class AdminControl:
 
     def __init__(self):
-        self.admin_cache = AsyncAdminCache(250)
+        self.roster = admin_roster
 
     async def is_admin(self, client, query):
-        cached_result = await self.admin_cache.get(query.chat.id, query.from_user.id)
-        if cached_result is not None:
-            print(f"This is_admin value is from cache: {cached_result}")
-            return cached_result
-
         try:
             if query.chat.id == query.from_user.id:
                 log.getLogger().debug("Chat ID is equal to user ID")
                 return False
-            
-            user = await client.get_chat_member(query.chat.id, query.from_user.id)
-            is_admin = user.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]
-            print(f"This is_admin value is new: {is_admin}")
 
-            await self.admin_cache.set(query.chat.id, query.from_user.id, is_admin)
-            
-            return is_admin
+            return await self.roster.is_admin(client, query.chat.id, query.from_user.id)
         except Exception as e:
             log.getLogger().debug(f"Error in is_admin: {e}")
             await client.send_message(query.chat.id, f"Something was happened: {e}")
@@ -179,12 +97,8 @@ def check_access_control(access_level: CommandAccessLevel):
     return filters.create(func)
 
 async def is_chat_allowed(_, client, query):
-    db = DBManager("moderator-db", "allowed-chats")
-
     try:
-        data = await db.find_data_in_collection_by({"chat_id": query.chat.id})
-
-        if not data:
+        if not await chat_registry.is_allowed(query.chat.id):
             log.getLogger().debug("Chat is not allowed")
             return False
 
@@ -201,8 +115,6 @@ async def is_chat_allowed(_, client, query):
         return False
     
 async def is_user_trusted(_, client, query):
-    db = DBManager("moderator-db", "trusted-users")
-
     try:
         reply_msg = getattr(query, "reply_to_message", None)
         if reply_msg is None or not reply_msg.from_user:
@@ -210,9 +122,8 @@ async def is_user_trusted(_, client, query):
             return False
         
         user_id = reply_msg.from_user.id
-        data = await db.find_data_in_collection_by({"chat_id": query.chat.id, "user_id": user_id})
 
-        if not data:
+        if not trusted_registry.is_trusted(query.chat.id, user_id):
             log.getLogger().debug(f"User {user_id} is not trusted in chat {query.chat.id}.")
             return False
         
@@ -224,13 +135,12 @@ async def is_user_trusted(_, client, query):
         return False
     
 async def is_automod_enabled(_, client, query):
-    automod_handler = AutoModerationHandler(client)
     try:
         if query.chat.id == query.from_user.id:
             log.getLogger().debug("Chat ID is equal to user ID")
             return False
         
-        automod_status = await automod_handler._get_automod_status(query.chat.id)
+        automod_status = await chat_registry.get_automod_status(query.chat.id)
         if automod_status:
             log.getLogger().debug(f"Automod is enabled in {query.chat.id} chat")
             return True
@@ -247,4 +157,36 @@ control = AdminControl()
 is_admin = filters.create(control.is_admin)
 is_chat_allowed = filters.create(is_chat_allowed)
 is_user_trusted = filters.create(is_user_trusted)
-is_automod_enabled = filters.create(is_automod_enabled)
\ No newline at end of file
+is_automod_enabled = filters.create(is_automod_enabled)
+
+# ----------------- Filter stages for the cost-ordered pipelines | BEGIN -----------------
+def has_text(_, query) -> bool:
+    """The message is not a service message and has a text or a caption."""
+    return not getattr(query, "service", None) and bool(getattr(query, "text", None) or getattr(query, "caption", None))
+
+def is_not_service(_, query) -> bool:
+    """The message was sent by a user, it is not a join, pin or other service message."""
+    return not getattr(query, "service", None)
+
+me_stage = FilterStage("me", FilterCost.STATIC, filters.me)
+group_stage = FilterStage("group", FilterCost.STATIC, filters.group)
+text_stage = FilterStage("has_text", FilterCost.STATIC, has_text)
+not_service_stage = FilterStage("is_not_service", FilterCost.STATIC, is_not_service)
+
+chat_allowed_stage = FilterStage("is_chat_allowed", FilterCost.MEMORY, is_chat_allowed)
+automod_enabled_stage = FilterStage("is_automod_enabled", FilterCost.MEMORY, is_automod_enabled)
+
+# The access control reads the owner id from the .env file and the admin check may call the API
+admin_stage = FilterStage("is_admin", FilterCost.IO, is_admin)
+
+_access_stages = {
+    level: FilterStage(f"check_access_control:{level.value}", FilterCost.IO, check_access_control(level))
+    for level in CommandAccessLevel
+}
+
+def access_stage(access_level: CommandAccessLevel) -> FilterStage:
+    return _access_stages[access_level]
+
+def command_stage(command: str, prefixes: str = ".") -> FilterStage:
+    return FilterStage(f"command:{prefixes}{command}", FilterCost.STATIC, filters.command(command, prefixes=prefixes))
+# ------------------ Filter stages for the cost-ordered pipelines | END ------------------
@@ -26,6 +26,7 @@ class ModDecision:
     warning_text: Optional[str] = None
     duration: Optional[int] = None
     confidence: float = 0.0
+    is_error: bool = False  # The model gave no decision (timeout, outage, unparsable answer)
 
 class ModerationActions:
     def __init__(self, client: Client):
@@ -39,7 +40,8 @@ class ModerationActions:
         self,
         chat_id: int,
         user_id: int,
-        decision: ModDecision
+        decision: ModDecision,
+        message_id: int | None = None
     ) -> bool:
         try:
             if decision.action == ModAction.NONE:
@@ -60,6 +62,10 @@ class ModerationActions:
                 return await self.ban.ban_user(chat_id, user_id)
 
             if decision.action == ModAction.DELETE:
+                if message_id is not None:
+                    _log.getLogger().debug(f"Deleting message {message_id} of user {user_id} in chat {chat_id} for reason: {decision.reason}")
+                    return bool(await self.client.delete_messages(chat_id, message_id))
+
                 _log.getLogger().debug(f"Deleting messages from user {user_id} in chat {chat_id} for reason: {decision.reason}")
                 return await self.message.delete_message(chat_id, user_id)
 
@@ -1,10 +1,13 @@
 import re
+from dataclasses import dataclass
 from typing import List, Tuple
 
 from pyrogram.enums import MessageEntityType
 
 from fuzzywuzzy import fuzz
 
+from ._pattern_engine import CompiledPatternSet
+from ._normalizer import NormalizedText, normalize_text
 from logger import Log 
 from constants import STANDARD_LOG_LEVEL
 
@@ -26,49 +29,121 @@ AD_KEYWORDS = [
 #     "бот", "нажми", "получи бонус"
 # ]
 
-class AdDetector:
+URL_PATTERN = re.compile(r"(https?://\S+|t\.me/\S+|@\w+|www\.\S+)", re.IGNORECASE)
+FUZZY_THRESHOLD = 85
 
-    def __init__(self):
-        self.matched_keywords: List[str] = []
-        self.fuzzy_hits: List[Tuple[str, int]] = []
+# Entities that Telegram has already recognized as links or mentions
+_LINK_ENTITY_TYPES = (MessageEntityType.URL, MessageEntityType.TEXT_LINK, MessageEntityType.MENTION)
 
-        self.URL_PATTERN = re.compile(r"(https?://\S+|t\.me/\S+|@\w+|www\.\S+)", re.IGNORECASE)
-        self.FUZZY_THRESHOLD = 85
+@dataclass(frozen=True)
+class AdDetection:
+    is_ad: bool
+    reason: str | None = None
+    method: str | None = None
+    matched_keywords: Tuple[str, ...] = ()
+    fuzzy_hits: Tuple[Tuple[str, int], ...] = ()
+    has_link: bool = False
+    linked_urls: Tuple[str, ...] = ()
 
-    def detect_ad_message(self, msg) -> Tuple[str, str, bool]:
+class AdDetector:
+    """A stateless advertisement detector.
+
+    The keyword set is compiled into one matcher and expanded for fuzzy matching once, when
+    the detector is created. Detection doesn't change the detector, so one instance is shared
+    by every handler and can be used from worker threads.
+    """
+
+    def __init__(self, keywords: List[str] = AD_KEYWORDS, fuzzy_threshold: int = FUZZY_THRESHOLD):
+        """Compile the keyword set.
+        :param keywords: The ad keywords, each one is a regex.
+        :param fuzzy_threshold: The minimal fuzz.partial_ratio score of a fuzzy hit.
+        """
+        self.keywords = list(keywords)
+        self.fuzzy_threshold = fuzzy_threshold
+
+        self._matcher = CompiledPatternSet([{"text": kw} for kw in self.keywords])
+        # Canonical plain text variants of the keywords for fuzzy matching
+        self._expansions = self._matcher.expansions
+
+    def detect_ad_message(self, msg, normalized: NormalizedText | None = None, fuzzy: bool = True) -> AdDetection:
+        """Detect advertisement in the message.
+        :param msg: The message object.
+        :param normalized: The normalized message text, computed here if it is not specified.
+        :param fuzzy: Whether to fuzzy match the keywords that are not found exactly.
+        """
         _log.getLogger().debug("Start detecting ads...")
 
-        text = getattr(msg, "text", None)
-        entities = getattr(msg, "entities", None)
+        text = getattr(msg, "text", None) or getattr(msg, "caption", None) or ""
+        entities = getattr(msg, "entities", None) or getattr(msg, "caption_entities", None) or []
+
+        if normalized is None:
+            normalized = normalize_text(text)
+
+        methods = []
+
+        # The canonical form catches obfuscated keywords without fuzzy matching
+        matched = set(self._matcher.find_all(text))
+        if normalized.canonical != normalized.lowered:
+            matched.update(self._matcher.find_all(normalized.canonical))
 
-        method = ""
-        for kw in AD_KEYWORDS:
-            if re.search(kw, text, flags=re.IGNORECASE):
-                method += "re.search"
-                self.matched_keywords.append(kw)
+        matched_keywords = tuple(self.keywords[index] for index in sorted(matched))
+        if matched_keywords:
+            methods.append("re.search")
 
-            score = fuzz.partial_ratio(kw.lower(), text.lower())
-            if score >= self.FUZZY_THRESHOLD:
-                method += "fuzzywuzzy"
-                self.fuzzy_hits.append((kw, score))
+        fuzzy_hits = self._find_fuzzy_hits(normalized.canonical, matched) if fuzzy else ()
+        if fuzzy_hits:
+            methods.append("fuzzywuzzy")
 
-        has_link = bool(self.URL_PATTERN.search(text))
+        # Telegram entities are checked first, the regex is only a fallback for unparsed links
+        link_entities = [entity for entity in entities if entity.type in _LINK_ENTITY_TYPES]
+        linked_urls = tuple(entity.url for entity in link_entities if entity.type == MessageEntityType.TEXT_LINK and entity.url)
 
-        if self.matched_keywords or self.fuzzy_hits or has_link or entities:
-            reason = ""
+        if link_entities:
+            has_link = True
+            methods.append("entities")
+        else:
+            has_link = bool(URL_PATTERN.search(text))
             if has_link:
-                reason += "Содержит ссылку. "
-            if entities:
-                for entity in entities:
-                    if entity.type == MessageEntityType.TEXT_LINK:
-                        reason += f"Содержит вложенную ссылку на {entity.url}"
-            if self.matched_keywords:
-                reason += f"Ключевые слова: {', '.join(self.matched_keywords)}. "
-            if self.fuzzy_hits:
-                fuzzy_str = ", ".join([f"{kw} ({score})" for kw, score in self.fuzzy_hits])
-                reason += f"Похожие выражения: {fuzzy_str}."
-
-            return reason, method, True
-
-        return None, None, False
-    
\ No newline at end of file
+                methods.append("url_pattern")
+
+        if not (matched_keywords or fuzzy_hits or has_link):
+            return AdDetection(is_ad=False)
+
+        reason = ""
+        if has_link:
+            reason += "Содержит ссылку. "
+        for url in linked_urls:
+            reason += f"Содержит вложенную ссылку на {url}"
+        if matched_keywords:
+            reason += f"Ключевые слова: {', '.join(matched_keywords)}. "
+        if fuzzy_hits:
+            fuzzy_str = ", ".join([f"{kw} ({score})" for kw, score in fuzzy_hits])
+            reason += f"Похожие выражения: {fuzzy_str}."
+
+        return AdDetection(
+            is_ad=True,
+            reason=reason,
+            method=", ".join(methods),
+            matched_keywords=matched_keywords,
+            fuzzy_hits=fuzzy_hits,
+            has_link=has_link,
+            linked_urls=linked_urls
+        )
+
+    def _find_fuzzy_hits(self, canonical_text: str, matched: set) -> Tuple[Tuple[str, int], ...]:
+        """Score the keywords not found exactly that share enough trigrams with the text."""
+        best_scores = {}
+        expansions = self._expansions
+
+        for index in expansions.index.candidates(canonical_text, self.fuzzy_threshold):
+            owner = expansions.owners[index]
+            if owner in matched:
+                continue
+
+            score = fuzz.partial_ratio(expansions.options[index], canonical_text)
+            if score >= self.fuzzy_threshold and score > best_scores.get(owner, 0):
+                best_scores[owner] = score
+
+        return tuple((self.keywords[owner], score) for owner, score in sorted(best_scores.items()))
+
+ad_detector = AdDetector()
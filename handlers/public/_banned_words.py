@@ -0,0 +1,159 @@
+import asyncio
+import re
+import sys
+from typing import Dict, List
+
+from core.cache import AsyncTTLCache
+from core.db_manager import DBManager
+from ._pattern_engine import CompiledPatternSet, PatternMatch
+from ._normalizer import NormalizedText, canonicalize
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, BANNED_WORDS_CACHE_MAX_CHATS, BANNED_WORDS_CACHE_MAX_BYTES, BANNED_WORDS_CACHE_TTL, API_NEGATIVE_CACHE_TTL
+
+_log = Log("BannedWords")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+# A rough per-pattern cost of the compiled program on top of the pattern text itself
+_PATTERN_OVERHEAD_BYTES = 512
+_PATTERN_BYTES_PER_CHAR = 32
+
+def _estimate_size(compiled: CompiledPatternSet) -> int:
+    """Approximate the memory held by a compiled banned word set in bytes."""
+    size = sys.getsizeof(compiled.patterns)
+    for pattern in compiled.patterns:
+        size += _PATTERN_OVERHEAD_BYTES + len(pattern["text"]) * _PATTERN_BYTES_PER_CHAR
+
+    return size
+
+class BannedWordStore:
+    """Per-chat banned words, compiled on first use.
+
+    Every chat has one document in the 'banned-words' collection: {"chat_id", "words", "version"}.
+    Only the chat_id -> version map is kept in memory permanently. The compiled matchers live in
+    an LRU bounded by an estimated byte budget and keyed by (chat_id, version), so an edit makes the
+    old matcher unreachable and a chat that stays quiet is eventually evicted.
+    """
+
+    def __init__(
+        self,
+        db: DBManager,
+        max_chats: int = BANNED_WORDS_CACHE_MAX_CHATS,
+        max_bytes: int = BANNED_WORDS_CACHE_MAX_BYTES,
+        ttl: float = BANNED_WORDS_CACHE_TTL
+    ):
+        self._db = db
+        self._versions: Dict[int, int] = {}
+        self._is_loaded = False
+        self._matchers = AsyncTTLCache("banned_words", max_chats, ttl, weigher=_estimate_size, max_weight=max_bytes)
+        # Lookups made while the startup load has failed. Concurrent misses share one query,
+        # and a chat without banned words or a failed query is remembered for a short time only
+        self._lookups = AsyncTTLCache("banned_word_versions", max_chats, ttl, API_NEGATIVE_CACHE_TTL)
+
+    async def load(self) -> bool:
+        """Load the version of every chat's banned words. Should be called once at startup."""
+        data = await self._db.find_data_in_collection_by({}, {"chat_id": 1, "version": 1})
+
+        if data is None:
+            _log.getLogger().error("Failed to load banned word versions, falling back to lazy loading")
+            return False
+
+        self._versions = {doc["chat_id"]: doc.get("version", 0) for doc in data if "chat_id" in doc}
+        self._is_loaded = True
+
+        _log.getLogger().debug(f"Loaded banned word versions of {len(self._versions)} chats")
+        return True
+
+    async def _get_version(self, chat_id: int) -> int | None:
+        if chat_id in self._versions:
+            return self._versions[chat_id]
+
+        if self._is_loaded:
+            return None
+
+        return await self._lookups.get_or_load(chat_id, lambda: self._load_version(chat_id))
+
+    async def _load_version(self, chat_id: int) -> int | None:
+        # The startup load has failed, so look the chat up and remember the result
+        data = await self._db.find_data_in_collection_by({"chat_id": chat_id}, {"version": 1})
+        if not data:
+            return None
+
+        version = self._versions[chat_id] = data[-1].get("version", 0)
+        return version
+
+    async def get_words(self, chat_id: int) -> List[str]:
+        data = await self._db.find_data_in_collection_by({"chat_id": chat_id})
+        if not data:
+            return []
+
+        return [word["text"] for word in data[-1].get("words", []) if word.get("text")]
+
+    async def _compile(self, chat_id: int) -> CompiledPatternSet:
+        words = await self.get_words(chat_id)
+
+        # Every word is matched both as typed and in the canonical form used for the normalized text
+        patterns, seen = [], set()
+        for word in words:
+            for variant in (word.lower(), canonicalize(word)):
+                if variant and variant not in seen:
+                    seen.add(variant)
+                    patterns.append({"text": re.escape(variant), "word": word})
+
+        compiled = await asyncio.to_thread(CompiledPatternSet, patterns, re.IGNORECASE, False)
+        _log.getLogger().debug(f"Compiled {len(words)} banned words of chat {chat_id}")
+
+        return compiled
+
+    async def get_matcher(self, chat_id: int) -> CompiledPatternSet | None:
+        """Return the compiled banned words of the chat or None if it has none."""
+        version = await self._get_version(chat_id)
+        if version is None:
+            return None
+
+        return await self._matchers.get_or_load((chat_id, version), lambda: self._compile(chat_id))
+
+    async def find(self, chat_id: int, normalized: NormalizedText) -> PatternMatch | None:
+        """Return the first banned word found in the message text or None."""
+        matcher = await self.get_matcher(chat_id)
+        if not matcher:
+            return None
+
+        return matcher.search(normalized.lowered) or matcher.search(normalized.canonical)
+
+    async def add_word(self, chat_id: int, word: str) -> bool:
+        result = await self._db.update_one_data(
+            {"chat_id": chat_id},
+            {"$addToSet": {"words": {"text": word}}, "$inc": {"version": 1}},
+            upsert=True
+        )
+        if result is None:
+            return False
+
+        self._bump_version(chat_id)
+        return True
+
+    async def remove_word(self, chat_id: int, word: str) -> bool:
+        result = await self._db.update_one_data(
+            {"chat_id": chat_id, "words.text": word},
+            {"$pull": {"words": {"text": word}}, "$inc": {"version": 1}}
+        )
+        if result is None or not result.modified_count:
+            return False
+
+        self._bump_version(chat_id)
+        return True
+
+    def _bump_version(self, chat_id: int):
+        """Write-through hook: the next lookup compiles a fresh matcher under the new version."""
+        self._matchers.invalidate_where(lambda key: key[0] == chat_id)
+        self._lookups.invalidate(chat_id)
+        self._versions[chat_id] = self._versions.get(chat_id, 0) + 1
+
+    def stats(self) -> dict:
+        return self._matchers.stats()
+
+    def is_loaded(self) -> bool:
+        return self._is_loaded
+
+banned_word_store = BannedWordStore(DBManager("moderator-db", "banned-words"))
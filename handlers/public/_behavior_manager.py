@@ -1,51 +1,175 @@
-import re
+import asyncio
+import hashlib
 from typing import List, Dict, Tuple
 
 from fuzzywuzzy import fuzz
 
 from core.db_manager import DBManager
+from ._pattern_engine import CompiledPatternSet
+from ._normalizer import NormalizedText, normalize_text
 from logger import Log
-from constants import STANDARD_LOG_LEVEL
+from constants import STANDARD_LOG_LEVEL, PATTERNS_REFRESH_INTERVAL
 
 _log = Log("BehaviorManager")
 _log.getLogger().setLevel(STANDARD_LOG_LEVEL)
 _log.write_logs_to_file()
 
 banned_behaviors = DBManager("moderator-db", "banned-behaviors")
-_cached_patterns: List[Dict] = []  # Cache for patterns to avoid repeated database calls
+
+class PatternStore:
+    """Versioned, hot-reloadable banned behaviors.
+
+    A background task polls the 'banned-behaviors' collection. When the 'version' field of its
+    documents changes (or, for documents without it, the content hash), the new pattern set is
+    compiled and expanded in a worker thread and swapped in with one assignment, so message
+    processing never waits for it. An empty collection is stored as an empty pattern set.
+    """
+
+    def __init__(self, db: DBManager, refresh_interval: float = PATTERNS_REFRESH_INTERVAL):
+        self._db = db
+        self._refresh_interval = refresh_interval
+        self._current = CompiledPatternSet([])
+        self._version = None
+        self._is_loaded = False
+        self._refresh_task: asyncio.Task | None = None
+
+    def get(self) -> CompiledPatternSet:
+        """Return the current pattern set without any I/O."""
+        return self._current
+
+    def get_version(self):
+        return self._version
+
+    def is_loaded(self) -> bool:
+        return self._is_loaded
+
+    async def refresh(self) -> bool:
+        """Reload the patterns if their version has changed. Returns True if a new set was swapped in."""
+        versions = await self._db.find_data_in_collection_by({}, {"version": 1})
+        if versions is None:
+            _log.getLogger().error("Failed to check the banned behaviors version")
+            return False
+
+        documents = None
+        if versions and all("version" in doc for doc in versions):
+            version = tuple(sorted((str(doc["_id"]), doc["version"]) for doc in versions))
+        else:
+            # Without a version field the content itself is the version
+            documents = await self._db.get_all_data_in_collection()
+            if documents is None:
+                _log.getLogger().error("Failed to load banned behaviors")
+                return False
+            version = self._hash_documents(documents)
+
+        if self._is_loaded and version == self._version:
+            return False
+
+        if documents is None:
+            documents = await self._db.get_all_data_in_collection()
+            if documents is None:
+                _log.getLogger().error("Failed to load banned behaviors")
+                return False
+
+        patterns = [pattern for doc in documents for pattern in doc.get("patterns", [])]
+
+        # Compiling and expanding thousands of patterns is CPU work, keep it off the event loop
+        compiled_patterns = await asyncio.to_thread(CompiledPatternSet, patterns)
+
+        self._current = compiled_patterns
+        self._version = version
+        self._is_loaded = True
+
+        if patterns:
+            _log.getLogger().debug(f"Loaded {len(patterns)} patterns from the database.")
+        else:
+            _log.getLogger().debug("No patterns found in the database.")
+
+        return True
+
+    def _hash_documents(self, documents: List[Dict]) -> str:
+        digest = hashlib.sha1()
+        for doc in sorted(documents, key=lambda doc: str(doc.get("_id"))):
+            for pattern in doc.get("patterns", []):
+                digest.update(repr(pattern.get("text") if isinstance(pattern, dict) else pattern).encode("utf-8"))
+                digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                _log.getLogger().error(f"Error while refreshing banned behaviors: {e}")
+
+    def start(self):
+        """Start the background refresher."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+pattern_store = PatternStore(banned_behaviors)
 
 class BehaviorManager:
     def __init__(self):
         self.fuzzy_treshold = 85
         self.trigger_level = 4
 
-    async def check_offensive_behavior(self, message):
-        """Check if the message contains any offensive behavior."""
+    async def check_offensive_behavior(self, message, normalized: NormalizedText | None = None):
+        """Check if the message contains any offensive behavior.
+        :param message: The message text.
+        :param normalized: The normalized message text, computed here if it is not specified.
+        """
+        if not message:
+            return "", False
+
+        if normalized is None:
+            normalized = normalize_text(message)
+
+        compiled_patterns = await self.get_compiled_patterns()
+        return self.match_patterns(message, normalized, compiled_patterns)
+
+    async def get_compiled_patterns(self) -> CompiledPatternSet:
+        """Return the banned behaviors compiled into one matcher. The store is refreshed in the background."""
+        return pattern_store.get()
+
+    def match_patterns(self, message: str, normalized: NormalizedText, compiled_patterns: CompiledPatternSet, fuzzy: bool = True) -> Tuple[str, bool]:
+        """Match the message against the compiled patterns. Doesn't do any I/O, so it can run in a worker.
+        :param message: The message text.
+        :param normalized: The normalized message text.
+        :param compiled_patterns: The compiled banned behaviors.
+        :param fuzzy: Whether to fall back to fuzzy matching when no pattern matches exactly.
+        """
         if not message:
             return "", False
 
-        # Fetch all banned behaviors from the database
-        banned_behaviors_list = await self._load_patterns()
-        if not banned_behaviors_list:
+        if not compiled_patterns:
             _log.getLogger().debug("No banned behaviors found in the database.")
             return "", False
 
-        for behavior in banned_behaviors_list:
-            match = re.search(behavior["text"], message, re.IGNORECASE)
+        # One pass over the message with all patterns combined into a single matcher,
+        # then one more over the canonical form to catch obfuscated words
+        match = compiled_patterns.search(message)
+        if not match and normalized.canonical != normalized.lowered:
+            match = compiled_patterns.search(normalized.canonical)
 
-            if match:
-                matched_text = match.group(0)
-                _log.getLogger().info(f"Found exact match {matched_text} for pattern: {behavior['text']}")
+        if match:
+            _log.getLogger().info(f"Found exact match {match.matched_text} for pattern: {match.pattern['text']}")
 
-                start, end = match.span()
-                _log.getLogger().debug(f"Matched text: '{matched_text}' at position {start}-{end} in the message.")
+            start, end = match.span
+            _log.getLogger().debug(f"Matched text: '{match.matched_text}' at position {start}-{end} in the message.")
 
-                if match.groups():
-                    _log.getLogger().debug(f"Matched groups: {match.groups()}")
+            return "re.search", True  # Return True immediately if an exact match is found
 
-                return "re.search", True  # Return True immediately if an exact match is found
+        if not fuzzy:
+            _log.getLogger().debug("No offensive behavior detected.")
+            return "", False
 
-        result, score = self.find_best_pattern_match(message, banned_behaviors_list)
+        result, score = self._find_best_match(normalized.canonical, compiled_patterns)
         if result:
             _log.getLogger().info(f"Fuzzy match found: {result['text']} with score {score}.")
             _log.getLogger().debug(f"Matched text: '{result['text']}' with score {score} in the message.")
@@ -54,55 +178,21 @@ class BehaviorManager:
         _log.getLogger().debug("No offensive behavior detected.")
         return "", False
 
-    def _expand_pattern(self, pattern: str) -> List[str]:
-        """Expand the behavior text to include variations."""
-        match = re.findall(r"\(([^()]+)\)", pattern)
-        if not match:
-            return [pattern]
-
-        variants = []
-        for group in match:
-            parts = group.split("|")
-            variants.append(parts)
-
-        # Build all combinations of the pattern with the variants
-        def build_options(base: str, parts: List[List[str]]) -> List[str]:
-            """Recursively build all combinations of the base pattern with the variants."""
-            results = [base]
-            for group in parts:
-                new_results = []
-                for prefix in results:
-                    for part in group:
-                        new_results.append(re.sub(r"\([^()]+\)", part, prefix, count=1))
-                results = new_results
-            return results
-        
-        return build_options(pattern, variants)
-    
-    def find_best_pattern_match(self, text: str, patterns: List[Dict]) -> Tuple[Dict, int]:
-        matches = []
-        for pattern in patterns:
-            options = self._expand_pattern(pattern["text"])
-            for opt in options:
-                score = fuzz.partial_ratio(opt.lower(), text.lower())
-                if score >= self.fuzzy_treshold:
-                    matches.append((pattern, score))
-
-        if not matches:
+    def _find_best_match(self, text: str, compiled_patterns: CompiledPatternSet) -> Tuple[Dict, int]:
+        # The variants are expanded and canonicalized once per pattern set, not per message
+        expansions = compiled_patterns.expansions
+
+        best_index, best_score = -1, 0
+        for candidate in expansions.index.candidates(text, self.fuzzy_treshold):
+            score = fuzz.partial_ratio(expansions.options[candidate], text)
+            if score >= self.fuzzy_treshold and score > best_score:
+                best_index, best_score = expansions.owners[candidate], score
+
+        if best_index < 0:
             return ({}, 0)
 
-        # Find the pattern with the highest score
-        best = max(matches, key=lambda x: x[1])
-        return best  # (pattern_dict, score)
+        return compiled_patterns.patterns[best_index], best_score  # (pattern_dict, score)
     
     async def _load_patterns(self):
-        """Load patterns from the database and cache them."""
-        global _cached_patterns
-        if not _cached_patterns:
-            _cached_patterns = await banned_behaviors.get_all_data_in_collection()
-            if not _cached_patterns:
-                _log.getLogger().debug("No patterns found in the database.")
-            else:
-                _log.getLogger().debug(f"Loaded {len(_cached_patterns[0]['patterns'])} patterns from the database.")
-        return _cached_patterns[0]["patterns"] if _cached_patterns else []
-    
\ No newline at end of file
+        """Return the patterns of the current set. The store loads them at startup and refreshes them in the background."""
+        return (await self.get_compiled_patterns()).patterns
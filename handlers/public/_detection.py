@@ -0,0 +1,208 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from time import perf_counter
+
+from ._behavior_manager import BehaviorManager
+from ._ad_detector import AdDetection, ad_detector
+from ._normalizer import NormalizedText, normalize_text
+from ._pattern_engine import CompiledPatternSet
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, DETECTION_MODE, DETECTION_MAX_WORKERS, DETECTION_MAX_PENDING
+
+_log = Log("Detection")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+DETECTION_MODES = ("inline", "regex", "fuzzy")
+
+@dataclass(frozen=True)
+class EntitySnapshot:
+    type: object
+    url: str | None = None
+
+@dataclass(frozen=True)
+class MessageSnapshot:
+    """The part of a message the detectors need, small and picklable for worker processes."""
+    text: str
+    entities: Tuple[EntitySnapshot, ...] = ()
+    normalized: NormalizedText | None = None
+
+    @classmethod
+    def from_message(cls, msg, normalized: NormalizedText | None = None) -> "MessageSnapshot":
+        text = getattr(msg, "text", None) or getattr(msg, "caption", None) or ""
+        entities = getattr(msg, "entities", None) or getattr(msg, "caption_entities", None) or []
+
+        return cls(text, tuple(EntitySnapshot(entity.type, getattr(entity, "url", None)) for entity in entities), normalized)
+
+@dataclass(frozen=True)
+class DetectionResult:
+    behavior_method: str
+    is_triggered: bool
+    ad: AdDetection
+    timings: Dict[str, float] = field(default_factory=dict)
+
+# The pattern set preloaded by every worker process
+_worker_patterns: CompiledPatternSet | None = None
+
+def _init_worker(patterns: List[Dict]):
+    global _worker_patterns
+    _worker_patterns = CompiledPatternSet(patterns)
+
+def run_detection(snapshot: MessageSnapshot, compiled_patterns: CompiledPatternSet | None = None, fuzzy: bool = True) -> DetectionResult:
+    """Run every detector over the message. Pure CPU work, safe to run in a thread or a process.
+    :param snapshot: The message snapshot.
+    :param compiled_patterns: The compiled banned behaviors, the pattern set preloaded by the worker process is used if it is not specified.
+    :param fuzzy: Whether the detectors fall back to fuzzy matching.
+    """
+    if compiled_patterns is None:
+        compiled_patterns = _worker_patterns
+
+    timings = {}
+
+    normalized = snapshot.normalized
+    if normalized is None:
+        started = perf_counter()
+        normalized = normalize_text(snapshot.text)
+        timings["normalize"] = perf_counter() - started
+
+    started = perf_counter()
+    behavior_method, is_triggered = BehaviorManager().match_patterns(snapshot.text, normalized, compiled_patterns, fuzzy)
+    timings["behavior"] = perf_counter() - started
+
+    started = perf_counter()
+    ad = ad_detector.detect_ad_message(snapshot, normalized, fuzzy)
+    timings["ads"] = perf_counter() - started
+
+    return DetectionResult(behavior_method, is_triggered, ad, timings)
+
+class _StageStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+class DetectionExecutor:
+    """Runs the detection stage off the event loop.
+
+    'regex' mode runs exact matching only in a thread pool, 'fuzzy' mode runs exact and fuzzy
+    matching in a process pool whose workers preload the pattern set, 'inline' runs everything
+    on the event loop. At most max_pending detections wait for a worker, the overflow is
+    matched inline without fuzzy matching instead of queueing up.
+    """
+
+    def __init__(self, mode: str = DETECTION_MODE, max_workers: int = DETECTION_MAX_WORKERS, max_pending: int = DETECTION_MAX_PENDING):
+        """Initialize the executor.
+        :param mode: One of 'inline', 'regex' or 'fuzzy'.
+        :param max_workers: The number of worker threads or processes.
+        :param max_pending: The maximum number of detections submitted to the pool at once.
+        """
+        if mode not in DETECTION_MODES:
+            raise ValueError(f"mode must be one of {DETECTION_MODES}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._pool: Executor | None = None
+        self._pool_patterns: CompiledPatternSet | None = None
+        self._pending = 0
+        self._rejected = 0
+        self._stats: Dict[str, _StageStats] = {}
+
+    def _get_pool(self, compiled_patterns: CompiledPatternSet) -> Executor:
+        if self.mode == "regex":
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="detection")
+            return self._pool
+
+        # Worker processes preload the pattern set, so the pool is recreated when it changes
+        if self._pool is None or self._pool_patterns is not compiled_patterns:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+
+            _log.getLogger().debug(f"Starting {self.max_workers} detection worker processes with {len(compiled_patterns)} patterns")
+            # The bot runs threads (Mongo monitors, the default executor), forking it could copy a held lock
+            self._pool = ProcessPoolExecutor(
+                self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+                initargs=(compiled_patterns.patterns,)
+            )
+            self._pool_patterns = compiled_patterns
+
+        return self._pool
+
+    async def detect(self, msg, compiled_patterns: CompiledPatternSet, normalized: NormalizedText | None = None) -> DetectionResult:
+        """Run the detectors over the message according to the executor mode.
+        :param normalized: The normalized message text, computed by the detectors if it is not specified.
+        """
+        snapshot = MessageSnapshot.from_message(msg, normalized)
+        started = perf_counter()
+
+        if self.mode == "inline":
+            result = run_detection(snapshot, compiled_patterns)
+        elif self._pending >= self.max_pending:
+            self._rejected += 1
+            _log.getLogger().warning(f"Detection queue is full ({self._pending} pending), matching the message inline without fuzzy matching")
+            result = run_detection(snapshot, compiled_patterns, fuzzy=False)
+        else:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool(compiled_patterns)
+            self._pending += 1
+
+            try:
+                if self.mode == "regex":
+                    result = await loop.run_in_executor(pool, run_detection, snapshot, compiled_patterns, False)
+                else:
+                    result = await loop.run_in_executor(pool, run_detection, snapshot)
+            finally:
+                self._pending -= 1
+
+        total = perf_counter() - started
+        for stage, seconds in result.timings.items():
+            self._record(stage, seconds)
+        self._record("queue_wait", max(0.0, total - sum(result.timings.values())))
+        self._record("total", total)
+
+        _log.getLogger().debug(f"Detection finished in {total * 1000:.2f} ms: {', '.join(f'{stage}={seconds * 1000:.2f} ms' for stage, seconds in result.timings.items())}")
+
+        return result
+
+    def _record(self, stage: str, seconds: float):
+        stats = self._stats.get(stage)
+        if stats is None:
+            stats = self._stats[stage] = _StageStats()
+        stats.add(seconds)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "pending": self._pending,
+            "rejected": self._rejected,
+            "stages": {stage: stats.to_dict() for stage, stats in self._stats.items()}
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_patterns = None
+
+detection_executor = DetectionExecutor()
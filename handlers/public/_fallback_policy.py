@@ -0,0 +1,61 @@
+from enum import IntEnum
+
+from ._actions import ModAction, ModDecision
+from logger import Log
+from constants import STANDARD_LOG_LEVEL, AI_FALLBACK_MUTE_DURATION
+
+_log = Log("FallbackPolicy")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+class Severity(IntEnum):
+    LOW = 1
+    HIGH = 2
+
+class FallbackPolicy:
+    """Deterministic moderation used when the model gives no decision.
+
+    The severity comes from the detection signal alone: an exact pattern match, or an ad with
+    both a keyword and a link, is high severity and mutes the sender temporarily. Fuzzy-only
+    matches and lone links or keywords are low severity and only delete the message.
+    """
+
+    def __init__(self, mute_duration: int = AI_FALLBACK_MUTE_DURATION):
+        """Initialize the policy.
+        :param mute_duration: The mute duration for high severity messages, in seconds.
+        """
+        self.mute_duration = mute_duration
+
+    def get_severity(self, method: str, has_link: bool = False, is_ad: bool = False) -> Severity:
+        """Rate the detection signal.
+        :param method: The detection method, e.g. 're.search' or 'fuzzywuzzy' (a comma-separated list for ads).
+        :param has_link: Whether the message contains a link.
+        :param is_ad: Whether the signal comes from the ad detector.
+        """
+        methods = {part.strip() for part in (method or "").split(",")}
+        exact = "re.search" in methods
+
+        if is_ad:
+            return Severity.HIGH if exact and has_link else Severity.LOW
+
+        return Severity.HIGH if exact else Severity.LOW
+
+    def decide(self, method: str, has_link: bool = False, is_ad: bool = False) -> ModDecision:
+        severity = self.get_severity(method, has_link, is_ad)
+        _log.getLogger().debug(f"Falling back to the rule-based decision for {method} ({severity.name} severity)")
+
+        if severity == Severity.HIGH:
+            return ModDecision(
+                action=ModAction.MUTE,
+                reason=f"Автоматическое решение без ИИ: сработало правило ({method})",
+                duration=self.mute_duration,
+                confidence=1.0
+            )
+
+        return ModDecision(
+            action=ModAction.DELETE,
+            reason=f"Автоматическое решение без ИИ: подозрительное сообщение ({method})",
+            confidence=1.0
+        )
+
+fallback_policy = FallbackPolicy()
@@ -0,0 +1,173 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict
+
+from pyrogram.enums import MessageEntityType
+
+from ._actions import ModAction, ModDecision
+from logger import Log
+from constants import (
+    STANDARD_LOG_LEVEL,
+    FLOOD_USER_RATE,
+    FLOOD_USER_BURST,
+    FLOOD_LINK_RATE,
+    FLOOD_LINK_BURST,
+    FLOOD_CHAT_RATE,
+    FLOOD_CHAT_BURST,
+    FLOOD_RAID_COST,
+    FLOOD_REPEAT_THRESHOLD,
+    FLOOD_REPEAT_WINDOW,
+    FLOOD_MUTE_DURATION,
+    FLOOD_MAX_TRACKED_USERS,
+    FLOOD_IDLE_TTL
+)
+
+_log = Log("FloodDetector")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_LINK_ENTITY_TYPES = (MessageEntityType.URL, MessageEntityType.TEXT_LINK)
+
+class TokenBucket:
+    """A token bucket refilled continuously at 'rate' tokens per second up to 'capacity'."""
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, rate: float, capacity: float, now: float, cost: float = 1) -> bool:
+        """Take 'cost' tokens, return False if the bucket doesn't hold enough of them."""
+        self.tokens = min(capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+
+        if self.tokens < cost:
+            return False
+
+        self.tokens -= cost
+        return True
+
+class _SenderState:
+    __slots__ = ("messages", "links", "last_hash", "repeats", "repeat_started", "flagged_until", "last_seen")
+
+    def __init__(self, now: float):
+        self.messages = TokenBucket(FLOOD_USER_BURST, now)
+        self.links = TokenBucket(FLOOD_LINK_BURST, now)
+        self.last_hash: int | None = None
+        self.repeats = 0
+        self.repeat_started = now
+        self.flagged_until = 0.0
+        self.last_seen = now
+
+class FloodDetector:
+    """Rate-based moderation that runs before any content analysis.
+
+    Every sender has a token bucket for messages and one for messages with links, and a count of
+    identical messages sent in a row. Every chat has a bucket too: when it runs dry the chat is
+    being raided and user messages cost FLOOD_RAID_COST tokens, which tightens the user limits.
+    A sender who runs out of tokens or repeats the same text FLOOD_REPEAT_THRESHOLD times is muted
+    for FLOOD_MUTE_DURATION, and the messages they send until the mute applies are deleted.
+
+    A check is O(1) and touches only memory. Senders are kept in LRU order, at most max_senders
+    of them, and senders idle for longer than idle_ttl are dropped, their buckets being full again.
+    """
+
+    def __init__(self, max_senders: int = FLOOD_MAX_TRACKED_USERS, idle_ttl: float = FLOOD_IDLE_TTL):
+        """Initialize the detector.
+        :param max_senders: The maximum number of tracked (chat, user) pairs.
+        :param idle_ttl: How long the counters of a silent sender are kept, in seconds.
+        """
+        self.max_senders = max_senders
+        self.idle_ttl = idle_ttl
+
+        self._senders: OrderedDict[tuple, _SenderState] = OrderedDict()
+        self._chats: Dict[int, TokenBucket] = {}
+
+        self._checked = 0
+        self._flagged = 0
+
+    def check(self, msg) -> ModDecision | None:
+        """Count the message and return a decision if its sender is flooding, None otherwise."""
+        sender = getattr(msg, "from_user", None)
+        if sender is None:
+            return None
+
+        now = monotonic()
+        chat_id = msg.chat.id
+        key = (chat_id, sender.id)
+        self._checked += 1
+
+        state = self._senders.get(key)
+        if state is None:
+            state = self._senders[key] = _SenderState(now)
+        else:
+            self._senders.move_to_end(key)
+        state.last_seen = now
+
+        self._evict(now)
+
+        if now < state.flagged_until:
+            return ModDecision(action=ModAction.DELETE, reason="Флуд: сообщение отправлено до применения ограничения", confidence=1.0)
+
+        reason = self._check_sender(state, chat_id, msg, now)
+        if reason is None:
+            return None
+
+        self._flagged += 1
+        state.flagged_until = now + FLOOD_MUTE_DURATION
+        _log.getLogger().debug(f"Sender {sender.id} is flooding chat {chat_id}: {reason}")
+
+        return ModDecision(action=ModAction.MUTE, reason=f"Флуд: {reason}", duration=FLOOD_MUTE_DURATION, confidence=1.0)
+
+    def _check_sender(self, state: _SenderState, chat_id: int, msg, now: float) -> str | None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = TokenBucket(FLOOD_CHAT_BURST, now)
+
+        cost = 1 if chat.consume(FLOOD_CHAT_RATE, FLOOD_CHAT_BURST, now) else FLOOD_RAID_COST
+
+        if not state.messages.consume(FLOOD_USER_RATE, FLOOD_USER_BURST, now, cost):
+            return "слишком много сообщений подряд"
+
+        entities = getattr(msg, "entities", None) or getattr(msg, "caption_entities", None) or []
+        if any(entity.type in _LINK_ENTITY_TYPES for entity in entities) and not state.links.consume(FLOOD_LINK_RATE, FLOOD_LINK_BURST, now, cost):
+            return "слишком много ссылок подряд"
+
+        text = msg.text or msg.caption
+        if not text:
+            return None
+
+        text_hash = hash(text.strip().casefold())
+        if text_hash == state.last_hash and now - state.repeat_started <= FLOOD_REPEAT_WINDOW:
+            state.repeats += 1
+        else:
+            state.last_hash, state.repeats, state.repeat_started = text_hash, 1, now
+
+        if state.repeats >= FLOOD_REPEAT_THRESHOLD:
+            return "повторяющиеся сообщения"
+
+        return None
+
+    def _evict(self, now: float):
+        # The front of the LRU order is the sender that has been silent the longest
+        while self._senders:
+            key, state = next(iter(self._senders.items()))
+            if len(self._senders) <= self.max_senders and now - state.last_seen <= self.idle_ttl:
+                break
+
+            del self._senders[key]
+
+            # A chat bucket left untouched for as long refilled long ago, it starts over full
+            chat = self._chats.get(key[0])
+            if chat is not None and now - chat.updated_at > self.idle_ttl:
+                del self._chats[key[0]]
+
+    def stats(self) -> dict:
+        return {
+            "checked": self._checked,
+            "flagged": self._flagged,
+            "senders": len(self._senders),
+            "chats": len(self._chats)
+        }
+
+flood_detector = FloodDetector()
@@ -0,0 +1,109 @@
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("NGramIndex")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+def _ngrams(text: str, n: int) -> List[str]:
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+class NGramIndex:
+    """A character n-gram inverted index used to prune fuzzy scoring.
+
+    fuzz.partial_ratio(s, text) >= threshold means that some window w of the text, at most
+    len(s) long, has a ratio 2 * M / (len(s) + len(w)) >= r with M the length of a common
+    subsequence of 's' and w, and r = (threshold - 0.5) / 100 because the score is rounded.
+    An unmatched character of 's' breaks at most n of its n-grams and an unmatched character
+    of w at most n - 1, so 's' keeps at least (len(s) - n + 1) - n * (len(s) - M) - (n - 1) *
+    (len(w) - M) n-grams that occur in the text. The loss is linear in len(w), which lies
+    between r * len(s) / (2 - r) (where M = len(w)) and len(s), so its maximum is at one of the
+    two ends. Strings sharing fewer n-grams with the text can't reach the threshold and are not
+    scored.
+    """
+
+    def __init__(self, strings: List[str], n: int = 3):
+        """Build the index.
+        :param strings: The lowercased strings to index (keywords or expanded patterns).
+        :param n: The n-gram size.
+        """
+        self.n = n
+        self._lengths = [len(s) for s in strings]
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for index, s in enumerate(strings):
+            counts: Dict[str, int] = defaultdict(int)
+            for gram in _ngrams(s, n):
+                counts[gram] += 1
+
+            for gram, count in counts.items():
+                self._postings.setdefault(gram, []).append((index, count))
+
+        # Sorted by length to find the strings longer than a text with bisect
+        self._by_length = sorted(range(len(strings)), key=lambda index: self._lengths[index])
+        self._sorted_lengths = [self._lengths[index] for index in self._by_length]
+        self._required: Dict[int, Tuple[List[int], List[int]]] = {}
+
+        _log.getLogger().debug(f"Indexed {len(strings)} strings by {len(self._postings)} distinct {n}-grams")
+
+    def _get_required_shared(self, threshold: int) -> Tuple[List[int], List[int]]:
+        """Return the required shared n-gram count of every string and the strings that need none."""
+        cached = self._required.get(threshold)
+        if cached is not None:
+            return cached
+
+        # The lowest unrounded ratio that partial_ratio rounds up to the threshold
+        ratio = (threshold - 0.5) / 100
+
+        def max_broken(length: int, window: float) -> float:
+            matched = ratio * (length + window) / 2
+            return self.n * (length - matched) + (self.n - 1) * (window - matched)
+
+        required = []
+        for length in self._lengths:
+            broken = max(max_broken(length, ratio * length / (2 - ratio)), max_broken(length, length))
+            # The epsilon keeps float error from rounding the bound down
+            required.append((length - self.n + 1) - math.floor(broken + 1e-9))
+
+        unconditional = [index for index in self._by_length if required[index] <= 0]
+
+        self._required[threshold] = (required, unconditional)
+        return required, unconditional
+
+    def candidates(self, text: str, threshold: int) -> List[int]:
+        """Return the sorted indexes of the strings that may reach the threshold against the text.
+        :param text: The lowercased text.
+        :param threshold: The fuzz.partial_ratio threshold, 0-100.
+        """
+        required, unconditional = self._get_required_shared(threshold)
+        text_length = len(text)
+
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in set(_ngrams(text, self.n)):
+            for index, count in self._postings.get(gram, ()):
+                shared[index] += count
+
+        result = {
+            index for index, count in shared.items()
+            if count >= required[index] and self._lengths[index] <= text_length
+        }
+
+        # Strings too short for the bound are always scored
+        for index in unconditional:
+            if self._lengths[index] > text_length:
+                break
+            result.add(index)
+
+        # partial_ratio aligns the shorter string inside the longer one, so the bound only
+        # holds for strings not longer than the text: the longer ones are always scored
+        result.update(self._by_length[bisect_right(self._sorted_lengths, text_length):])
+
+        return sorted(result)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
@@ -0,0 +1,81 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+
+# Zero-width and invisible formatting characters used to split words
+_INVISIBLE_CHARS = re.compile("[\u00ad\u034f\u115f\u1160\u180e\u200b-\u200f\u202a-\u202e\u2060-\u2064\u3164\ufeff]")
+
+_TOKEN = re.compile(r"\S+")
+_CYRILLIC = re.compile("[\u0400-\u04ff]")
+# Runs of three or more, so real double letters ("ссылка", "класс") survive. Digits are never
+# collapsed, amounts, phone numbers and ids must stay distinct
+_REPEATED_CHARS = re.compile(r"([^\d])\1{2,}", re.DOTALL)
+_DIGIT = re.compile(r"\d")
+_LETTER = re.compile(r"[^\W\d_]")
+
+# Latin letters and symbols that look like Cyrillic ones, folded in words that contain Cyrillic
+_TO_CYRILLIC = str.maketrans({
+    "A": "а", "a": "а", "B": "в", "C": "с", "c": "с", "E": "е", "e": "е", "H": "н",
+    "K": "к", "k": "к", "M": "м", "O": "о", "o": "о", "P": "р", "p": "р", "T": "т",
+    "X": "х", "x": "х", "Y": "у", "y": "у", "@": "а",
+})
+
+# Leetspeak, the digits and symbols that stand for letters
+_CYRILLIC_LEET = {"0": "о", "3": "з", "4": "ч", "6": "б"}
+_LATIN_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+
+_CYRILLIC_LEET_TABLE = str.maketrans(_CYRILLIC_LEET)
+_LATIN_LEET_TABLE = str.maketrans(_LATIN_LEET)
+
+@dataclass(frozen=True)
+class NormalizedText:
+    raw: str
+    lowered: str
+    canonical: str
+
+def _is_number(token: str) -> bool:
+    """Amounts, phone numbers and ids: more digits than letters, or a currency sign at an end."""
+    if unicodedata.category(token[0]) == "Sc" or unicodedata.category(token[-1]) == "Sc":
+        return True
+    return len(_DIGIT.findall(token)) > len(_LETTER.findall(token))
+
+def _is_leet(token: str, leet: dict) -> bool:
+    # A word is leetspeak only if every digit in it stands for a letter, "covid19" is not
+    return not _is_number(token) and all(char in leet for char in _DIGIT.findall(token))
+
+def _fold_token(match: re.Match) -> str:
+    token = match.group(0)
+
+    if _CYRILLIC.search(token):
+        token = token.translate(_TO_CYRILLIC)
+        if _is_leet(token, _CYRILLIC_LEET):
+            token = token.translate(_CYRILLIC_LEET_TABLE)
+        return token.lower()
+
+    token = token.lower()
+    if _is_leet(token, _LATIN_LEET):
+        return token.translate(_LATIN_LEET_TABLE)
+    return token
+
+def canonicalize(text: str) -> str:
+    """Return the canonical form of the text used by the detectors.
+
+    Applies NFKC, strips zero-width characters, folds Latin homoglyphs and leetspeak in
+    Cyrillic words, folds leetspeak in Latin words, lowercases and collapses runs of three or more
+    repeated non-digit characters into one. Numbers (mostly digits, or with a currency sign) are
+    kept as they are. Double letters are kept, so regex patterns and keywords written
+    in plain spelling match the canonical form as they are.
+    """
+    if not text:
+        return ""
+
+    text = unicodedata.normalize("NFKC", text)
+    text = _INVISIBLE_CHARS.sub("", text)
+    text = _TOKEN.sub(_fold_token, text)
+
+    return _REPEATED_CHARS.sub(r"\1", text)
+
+def normalize_text(text: str | None) -> NormalizedText:
+    """Normalize the message text once, so every detector can reuse the result."""
+    text = text or ""
+    return NormalizedText(raw=text, lowered=text.lower(), canonical=canonicalize(text))
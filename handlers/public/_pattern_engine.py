@@ -0,0 +1,177 @@
+import re
+from itertools import product
+from dataclasses import dataclass
+from typing import List, Dict, Tuple
+
+from ._ngram_index import NGramIndex
+from ._normalizer import canonicalize
+from logger import Log
+from constants import STANDARD_LOG_LEVEL
+
+_log = Log("PatternEngine")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_GROUP_PREFIX = "_p"
+
+# Patterns with backreferences or their own named groups can't be safely wrapped
+# into the combined alternation, so they are matched one by one
+_UNSAFE_TO_COMBINE = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)")
+
+_ALTERNATION_GROUP = re.compile(r"\(([^()]+)\)")
+
+def expand_pattern(pattern: str) -> List[str]:
+    """Expand every '(a|b|c)' group of the pattern into all of its plain text variants."""
+    # re.split with a capturing group alternates literal parts and group contents
+    parts = _ALTERNATION_GROUP.split(pattern)
+    if len(parts) == 1:
+        return [pattern]
+
+    literals = parts[0::2]
+    groups = [group.split("|") for group in parts[1::2]]
+
+    options = []
+    for choice in product(*groups):
+        option = literals[0]
+        for part, literal in zip(choice, literals[1:]):
+            option += part + literal
+        options.append(option)
+
+    return options
+
+class PatternExpansions:
+    """The plain text variants of a pattern set, expanded once when the patterns are loaded.
+
+    Variants are canonicalized and deduplicated into one flat list, 'owners' keeps the index
+    of the source pattern of every variant. The trigram index over the variants selects
+    the ones worth fuzzy scoring against a message.
+    """
+
+    def __init__(self, patterns: List[Dict]):
+        self.options: List[str] = []
+        self.owners: List[int] = []
+
+        seen = set()
+        for index, pattern in enumerate(patterns):
+            source = pattern.get("text") if isinstance(pattern, dict) else None
+            if not source:
+                continue
+
+            for option in expand_pattern(source):
+                option = canonicalize(option)
+                if option in seen:
+                    continue
+
+                seen.add(option)
+                self.options.append(option)
+                self.owners.append(index)
+
+        self.index = NGramIndex(self.options)
+
+        _log.getLogger().debug(f"Expanded {len(patterns)} patterns into {len(self.options)} unique variants")
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+@dataclass(frozen=True)
+class PatternMatch:
+    pattern: Dict
+    matched_text: str
+    span: Tuple[int, int]
+
+class CompiledPatternSet:
+    """A set of behavior patterns compiled into one combined matcher.
+
+    Every pattern becomes a named group of a single alternation, so one search over the
+    text reports which pattern fired and where, instead of one re.search per pattern.
+    The fuzzy matching variants of the patterns are expanded at the same time.
+    """
+
+    def __init__(self, patterns: List[Dict], flags: int = re.IGNORECASE, expand: bool = True):
+        """Compile the pattern set.
+        :param patterns: The pattern dicts, each with the regex in the 'text' key.
+        :param flags: The regex flags applied to every pattern.
+        :param expand: Whether to expand the fuzzy matching variants, not needed for exact matching only.
+        """
+        self.patterns = patterns
+        self._combined: re.Pattern | None = None
+        self._separate: List[Tuple[int, re.Pattern]] = []
+
+        combined_parts = []
+        for index, pattern in enumerate(patterns):
+            source = pattern.get("text") if isinstance(pattern, dict) else None
+            if not source:
+                continue
+
+            try:
+                compiled = re.compile(source, flags)
+            except re.error as e:
+                _log.getLogger().error(f"Skipping invalid pattern '{source}': {e}")
+                continue
+
+            if _UNSAFE_TO_COMBINE.search(source):
+                self._separate.append((index, compiled))
+            else:
+                combined_parts.append((index, source, compiled))
+
+        if combined_parts:
+            try:
+                self._combined = re.compile(
+                    "|".join(f"(?P<{_GROUP_PREFIX}{index}>{source})" for index, source, _ in combined_parts),
+                    flags
+                )
+            except re.error as e:
+                _log.getLogger().error(f"Failed to build the combined matcher, matching patterns one by one: {e}")
+                self._separate.extend((index, compiled) for index, _, compiled in combined_parts)
+                self._separate.sort(key=lambda item: item[0])
+
+        _log.getLogger().debug(f"Compiled {len(combined_parts)} patterns into one matcher, {len(self._separate)} patterns are matched separately")
+
+        self.expansions = PatternExpansions(patterns if expand else [])
+
+    def search(self, text: str) -> PatternMatch | None:
+        """Return the leftmost match of any pattern in the text or None."""
+        if not text:
+            return None
+
+        best: Tuple[int, re.Match] | None = None
+
+        if self._combined is not None:
+            match = self._combined.search(text)
+            if match:
+                # The wrapping group is always the last one closed, so lastgroup names it
+                best = (int(match.lastgroup[len(_GROUP_PREFIX):]), match)
+
+        for index, compiled in self._separate:
+            match = compiled.search(text)
+            if match and (best is None or match.start() < best[1].start()):
+                best = (index, match)
+
+        if best is None:
+            return None
+
+        index, match = best
+        group = match.lastgroup if match.re is self._combined else 0
+        return PatternMatch(self.patterns[index], match.group(group), match.span(group))
+
+    def find_all(self, text: str) -> List[int]:
+        """Return the sorted indexes of all patterns that match the text (non-overlapping matches)."""
+        if not text:
+            return []
+
+        found = set()
+        if self._combined is not None:
+            for match in self._combined.finditer(text):
+                found.add(int(match.lastgroup[len(_GROUP_PREFIX):]))
+
+        for index, compiled in self._separate:
+            if compiled.search(text):
+                found.add(index)
+
+        return sorted(found)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
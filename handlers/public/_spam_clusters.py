@@ -0,0 +1,223 @@
+import asyncio
+import random
+import re
+from dataclasses import dataclass
+from itertools import count
+from time import monotonic
+from typing import Dict, List, Set, Tuple
+
+from ._actions import ModAction, ModDecision
+from ._normalizer import canonicalize
+from logger import Log
+from constants import (
+    STANDARD_LOG_LEVEL,
+    SPAM_CLUSTER_MAX_CLUSTERS,
+    SPAM_CLUSTER_TTL,
+    SPAM_CLUSTER_HALF_LIFE,
+    SPAM_CLUSTER_MIN_SIMILARITY,
+    SPAM_CLUSTER_MIN_CONFIDENCE,
+    SPAM_CLUSTER_MAX_TEXT
+)
+
+_log = Log("SpamClusters")
+_log.getLogger().setLevel(STANDARD_LOG_LEVEL)
+_log.write_logs_to_file()
+
+_SHINGLE_SIZE = 4
+_MIN_SHINGLES = 8
+
+# 16 bands of 4 rows: pairs above ~0.5 Jaccard similarity almost always share a band
+_BANDS = 16
+_ROWS = 4
+_PERMUTATIONS = _BANDS * _ROWS
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 61) - 1
+
+_rng = random.Random(0x5EED)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(_PERMUTATIONS)]
+
+# Digits, punctuation and emoji are what spammers vary between copies, only letters are fingerprinted
+_NOISE = re.compile(r"[\W\d_]+")
+
+def shingles(text: str) -> Set[str]:
+    """Return the character shingles of the canonical letters of the text."""
+    letters = " ".join(_NOISE.sub(" ", canonicalize(text)).split())
+    return {letters[i:i + _SHINGLE_SIZE] for i in range(len(letters) - _SHINGLE_SIZE + 1)}
+
+def minhash(text: str) -> Tuple[int, ...] | None:
+    """Return the MinHash signature of the text or None if it is too short to compare.
+
+    The cost grows with the text, so only its first SPAM_CLUSTER_MAX_TEXT characters are hashed.
+    """
+    values = shingles(text[:SPAM_CLUSTER_MAX_TEXT])
+    if len(values) < _MIN_SHINGLES:
+        return None
+
+    # hash() is salted per process, which is fine for an index that only lives in memory
+    hashes = [hash(value) & _MASK for value in values]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _HASH_PARAMS)
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return sum(a == b for a, b in zip(first, second)) / _PERMUTATIONS
+
+@dataclass
+class SpamCluster:
+    id: int
+    signature: Tuple[int, ...]
+    decision: ModDecision
+    method: str
+    hits: int
+    created_at: float
+    last_seen: float
+
+class SpamClusterIndex:
+    """Near-duplicate index of recently judged spam.
+
+    Every confident, actionable AI verdict becomes a cluster keyed by the MinHash signature of the
+    message. A message whose estimated similarity to a cluster reaches SPAM_CLUSTER_MIN_SIMILARITY
+    reuses its decision. Candidates are found through LSH bands, so a lookup only compares the
+    clusters sharing a band with the message. Clusters expire after the TTL, and when the index
+    is full the one with the lowest time-decayed hit count is evicted, so the clusters of an
+    ongoing raid survive while the ones of a finished raid fade out.
+
+    Signatures are computed in a worker thread, the index itself is only changed on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_clusters: int = SPAM_CLUSTER_MAX_CLUSTERS,
+        ttl: float = SPAM_CLUSTER_TTL,
+        half_life: float = SPAM_CLUSTER_HALF_LIFE,
+        min_similarity: float = SPAM_CLUSTER_MIN_SIMILARITY,
+        min_confidence: float = SPAM_CLUSTER_MIN_CONFIDENCE
+    ):
+        """Initialize the index.
+        :param max_clusters: The maximum number of clusters kept in memory.
+        :param ttl: How long a cluster lives after its last hit, in seconds.
+        :param half_life: The half-life of a cluster's hit count used for eviction, in seconds.
+        :param min_similarity: The minimum estimated Jaccard similarity between a message and a cluster.
+        :param min_confidence: The minimum confidence of a verdict to start a cluster.
+        """
+        self.max_clusters = max_clusters
+        self.ttl = ttl
+        self.half_life = half_life
+        self.min_similarity = min_similarity
+        self.min_confidence = min_confidence
+
+        self._clusters: Dict[int, SpamCluster] = {}
+        self._bands: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = {}
+        self._ids = count()
+
+        self._matches = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _get_bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * _ROWS:(band + 1) * _ROWS]) for band in range(_BANDS)]
+
+    def _score(self, cluster: SpamCluster, now: float) -> float:
+        return cluster.hits * 0.5 ** ((now - cluster.last_seen) / self.half_life)
+
+    def _remove(self, cluster: SpamCluster):
+        self._clusters.pop(cluster.id, None)
+        for band in self._get_bands(cluster.signature):
+            members = self._bands.get(band)
+            if members is not None:
+                members.discard(cluster.id)
+                if not members:
+                    del self._bands[band]
+
+    def _find(self, signature: Tuple[int, ...], now: float) -> Tuple[float, SpamCluster] | None:
+        candidates = set()
+        for band in self._get_bands(signature):
+            candidates.update(self._bands.get(band, ()))
+
+        best: Tuple[float, SpamCluster] | None = None
+        for candidate in candidates:
+            cluster = self._clusters[candidate]
+            if now - cluster.last_seen > self.ttl:
+                self._remove(cluster)
+                self._evictions += 1
+                continue
+
+            score = similarity(signature, cluster.signature)
+            if score >= self.min_similarity and (best is None or score > best[0]):
+                best = (score, cluster)
+
+        return best
+
+    async def match(self, text: str | None) -> SpamCluster | None:
+        """Return the most similar live cluster for the text or None."""
+        if not self._clusters or not text:
+            return None
+
+        signature = await asyncio.to_thread(minhash, text)
+        if signature is None:
+            return None
+
+        now = monotonic()
+        found = self._find(signature, now)
+        if found is None:
+            return None
+
+        score, cluster = found
+        cluster.hits += 1
+        cluster.last_seen = now
+        self._matches += 1
+
+        _log.getLogger().debug(f"Message matched spam cluster {cluster.id} with similarity {score:.2f} ({cluster.hits} hits, method {cluster.method})")
+        return cluster
+
+    async def add(self, text: str | None, decision: ModDecision | None, method: str) -> bool:
+        """Feed a verdict into the index. Returns True if it was stored."""
+        if decision is None or decision.action == ModAction.NONE or decision.confidence < self.min_confidence:
+            return False
+
+        signature = await asyncio.to_thread(minhash, text or "")
+        if signature is None:
+            return False
+
+        now = monotonic()
+        found = self._find(signature, now)
+        if found is not None:
+            _, cluster = found
+            cluster.decision = decision
+            cluster.hits += 1
+            cluster.last_seen = now
+            return True
+
+        if len(self._clusters) >= self.max_clusters:
+            self._evict(now)
+
+        cluster = SpamCluster(next(self._ids), signature, decision, method, 1, now, now)
+        self._clusters[cluster.id] = cluster
+        for band in self._get_bands(signature):
+            self._bands.setdefault(band, set()).add(cluster.id)
+
+        _log.getLogger().debug(f"New spam cluster {cluster.id} for {decision.action.name} ({len(self._clusters)} clusters)")
+        return True
+
+    def _evict(self, now: float):
+        expired = [cluster for cluster in self._clusters.values() if now - cluster.last_seen > self.ttl]
+        for cluster in expired:
+            self._remove(cluster)
+        self._evictions += len(expired)
+
+        if len(self._clusters) >= self.max_clusters:
+            self._remove(min(self._clusters.values(), key=lambda cluster: self._score(cluster, now)))
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "clusters": len(self._clusters),
+            "max_clusters": self.max_clusters,
+            "matches": self._matches,
+            "evictions": self._evictions
+        }
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+spam_clusters = SpamClusterIndex()
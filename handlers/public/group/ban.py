@@ -1,5 +1,6 @@
 from pyrogram.errors import BadRequest
 
+from core import api_cache
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
@@ -23,6 +24,7 @@ class BanActions:
             
             _log.getLogger().debug(f"Process banning user {user_id} in chat {chat_id}...")
             data = await self.client.ban_chat_member(chat_id, user_id)
+            api_cache.invalidate_chat_member(self.client, chat_id, user_id)
 
             if not data:
                 _log.getLogger().error(f"Failed to ban user {user_id} from chat {chat_id}")
@@ -1,3 +1,4 @@
+import sys
 import datetime
 from typing import Optional, List
 
@@ -61,12 +62,13 @@ class MessageContext:
     """A class to represent the context of a message, including sender's name, text, and optional reply_to information."""
     
     class Message:
+        __slots__ = ("sender_name", "text", "reply_to", "triggered_by", "datetime")
 
         def __init__(self, sender_name: str, text: str, datetime: datetime, triggered_by: str, reply_to: Optional[str] = None):
             """Initialize the MessageContext class with a client instance.
             :param client: The client instance to interact with the Telegram API.
             """
-            self.sender_name = sender_name
+            self.sender_name = sys.intern(sender_name)
             self.text = text
             self.reply_to = reply_to
             self.triggered_by = triggered_by
@@ -82,6 +84,7 @@ class MessageContext:
         :return: A MessageContext instance containing the sender's name, text, message date, and optional reply_to information.
         """
         _log.getLogger().debug("Building message context from provided messages.")
+        self.context_lines = ["Message Context:"]
 
         if not messages:
             _log.getLogger().debug("No messages available to build context.")
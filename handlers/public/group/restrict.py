@@ -1,6 +1,7 @@
 from pyrogram.types import ChatPermissions
 from pyrogram.enums import ChatMemberStatus
 
+from core import api_cache
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
@@ -23,6 +24,8 @@ class RestrictActions:
             else:
                 data = await self.client.restrict_chat_member(chat_id, user_id, ChatPermissions(), date)
 
+            api_cache.invalidate_chat_member(self.client, chat_id, user_id)
+
             if not data:
                 _log.getLogger().error(f"Failed to restrict user {user_id} in chat {chat_id}")
                 return False
@@ -52,6 +55,7 @@ class RestrictActions:
                 can_invite_users=True,
                 can_pin_messages=True
             ))
+            api_cache.invalidate_chat_member(self.client, msg.chat.id, reply_msg.from_user.id)
 
             if not data:
                 return False
@@ -71,7 +75,7 @@ class RestrictActions:
             
             _log.getLogger().debug(f"Checking if user {reply_msg.from_user.id} is restricted in chat {msg.chat.id}")
 
-            user = await self.client.get_chat_member(msg.chat.id, reply_msg.from_user.id)
+            user = await api_cache.get_chat_member(self.client, msg.chat.id, reply_msg.from_user.id)
 
             if user is None:
                 return None
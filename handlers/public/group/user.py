@@ -1,5 +1,6 @@
 from pyrogram.errors import UserNotMutualContact
 
+from core import api_cache
 from utils.messages import format_user_info
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
@@ -33,7 +34,7 @@ async def user_info(client, msg):
             _log.getLogger().debug("Sender chat is not a user, cannot fetch user info.")
             return
         
-        user = await client.get_users(reply_message.from_user.id)
+        user = await api_cache.get_users(client, reply_message.from_user.id)
 
         if user:
             _log.getLogger().debug(f"User info fetched: {user.id} - {user.first_name} {user.last_name or ''}")
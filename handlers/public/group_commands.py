@@ -1,17 +1,29 @@
 import asyncio
-
-from pyrogram.enums import ChatMemberStatus
-
-from core.ai_manager import AIManager
-from ._actions import ModerationActions
+from datetime import datetime
+
+from core.ai_manager import AIManager, ai_breaker
+from core.ai_batcher import AIBatcher
+from core import api_cache
+from core.admin_roster import admin_roster
+from core.decision_cache import decision_cache
+from core.message_buffer import BufferedMessage, message_buffer
+from core.recent_joins import recent_joins
+from core.trusted_registry import trusted_registry
+from ._actions import ModerationActions, ModDecision, ModAction
+from enums import AIPriority
 from logger import Log
 from constants import STANDARD_LOG_LEVEL
 
 from .group.message import MessageContext, MessageActions
 from .group.restrict import RestrictActions
+from handlers.admin.group.automoderation import AutoModerationHandler
 
 from ._behavior_manager import BehaviorManager
-from ._ad_detector import AdDetector
+from ._detection import detection_executor
+from ._spam_clusters import spam_clusters
+from ._flood_detector import flood_detector
+from ._fallback_policy import fallback_policy
+from ._normalizer import normalize_text
 
 from utils.messages import format_user_restriction_info
 
@@ -27,9 +39,11 @@ class GroupCommands:
         self.client = client
 
         self.ai = AIManager()
+        self.ai_batcher = AIBatcher(self.ai)
         self.mod_actions = ModerationActions(client)
         self.restrict = RestrictActions(client)
         self.message = MessageActions(client)
+        self.automod = AutoModerationHandler(client)
 
     async def get_restricted_data(self, _, msg):
         try:
@@ -41,7 +55,7 @@ class GroupCommands:
                 await self.client.send_message(msg.chat.id, "Чтобы команда сработала, необходимо выбрать сообщение пользователя, а не группы или канала.")
                 return None
 
-            user = await self.client.get_chat_member(msg.chat.id, reply_msg.from_user.id)
+            user = await api_cache.get_chat_member(self.client, msg.chat.id, reply_msg.from_user.id)
             if user is None:
                 return None
 
@@ -86,12 +100,46 @@ class GroupCommands:
         :param _: Unused parameter, kept for compatibility with the handler signature.
         :param msg: The message object containing the command and context.
         """
+        sender = getattr(msg, "from_user", None)
+        if sender is not None and trusted_registry.is_trusted(msg.chat.id, sender.id):
+            _log.getLogger().debug(f"User {sender.id} is trusted in chat {msg.chat.id}, skipping automoderation")
+            return
+
+        # Floods are caught from message rates alone, before any content analysis
+        flood_decision = flood_detector.check(msg)
+        if flood_decision is not None:
+            # Admins can't be restricted, their bursts go on to the usual checks
+            if not await admin_roster.is_admin(self.client, msg.chat.id, sender.id):
+                await self._handle_decision(flood_decision, msg, self.mod_actions)
+                return
+
+        # Stickers, GIFs, photos and voice messages without a caption only count towards floods
+        if not (msg.text or msg.caption):
+            return
+
+        # The text is normalized once here and shared by the banned words and the detectors
+        normalized = normalize_text(msg.text or msg.caption)
+
+        # The chat's own banned words are cheap exact matches, a hit deletes the message right away
+        if await self.automod.handle_automod(msg, normalized):
+            return
+
+        # A near-duplicate of already judged spam reuses the verdict without detection or AI
+        cluster = await spam_clusters.match(msg.text or msg.caption)
+        if cluster is not None:
+            _log.getLogger().debug(f"Message {msg.id} in chat {msg.chat.id} matched a spam cluster, reusing decision {cluster.decision.action.name}")
+            await self._handle_decision(cluster.decision, msg, self.mod_actions)
+            return
+
         behavior_manager = BehaviorManager()
-        ad_detector = AdDetector()
         processing_messages = set()
 
-        analyze_method, is_triggered = await behavior_manager.check_offensive_behavior(msg.text)
-        reason, method, is_ad = ad_detector.detect_ad_message(msg)
+        # Regex and fuzzy matching run in the detection executor, off the event loop
+        compiled_patterns = await behavior_manager.get_compiled_patterns()
+        detection = await detection_executor.detect(msg, compiled_patterns, normalized)
+
+        analyze_method, is_triggered = detection.behavior_method, detection.is_triggered
+        reason, method, is_ad = detection.ad.reason, detection.ad.method, detection.ad.is_ad
 
         _triggered_by = getattr(msg, "from_user", getattr(msg, "sender_chat", None))
         if _triggered_by is None:
@@ -103,7 +151,7 @@ class GroupCommands:
             msg_id = f"{msg.chat.id}_{msg.from_user.id}_{msg.id}"
 
             if is_ad:
-                await self._moderate(msg, msg_id, processing_messages, method)
+                await self._moderate(msg, msg_id, processing_messages, method, is_ad=True, has_link=detection.ad.has_link)
                 _log.getLogger().debug(f"Ad Detected: {is_ad = }, {msg.id = }, {msg_id = }, {reason = }, {method = }")
             
             if is_triggered:
@@ -115,12 +163,20 @@ class GroupCommands:
             if msg_id in processing_messages:
                 processing_messages.remove(msg_id)
 
-    async def _moderate(self, msg, msg_id: str, processing_messages: set, analyze_method: str):
+    def _get_ai_priority(self, msg, is_ban_candidate: bool) -> AIPriority:
+        if is_ban_candidate:
+            return AIPriority.BAN_CANDIDATE
+
+        if recent_joins.is_new(msg.chat.id, msg.from_user.id):
+            return AIPriority.NEW_USER
+
+        return AIPriority.NORMAL
+
+    async def _moderate(self, msg, msg_id: str, processing_messages: set, analyze_method: str, is_ad: bool = False, has_link: bool = False):
         if msg_id in processing_messages:
             await self.client.send_message(msg.chat.id, "Сообщение уже обрабатывается. Пожалуйста, подождите.")
             return
 
-        context = await self.build_context(msg)
         processing_messages.add(msg_id)
 
         print(f"Processing restriction for message ID: {msg_id} in chat ID: {msg.chat.id}")
@@ -128,6 +184,13 @@ class GroupCommands:
         def handle_ai_decision(task):
             try:
                 decision = task.result()
+                asyncio.create_task(spam_clusters.add(msg.text or msg.caption, decision, analyze_method))
+
+                # The model gave no decision (outage, timeout, open circuit): moderate by the detection rules
+                if decision.is_error:
+                    _log.getLogger().warning(f"No AI decision for message {msg.id} in chat {msg.chat.id} ({decision.reason}), using the fallback policy")
+                    decision = fallback_policy.decide(analyze_method, has_link, is_ad)
+
                 asyncio.create_task(self._handle_decision(
                     decision,
                     msg,
@@ -138,7 +201,27 @@ class GroupCommands:
             finally:
                 processing_messages.remove(msg_id)
 
-        decision_task = asyncio.create_task(self.ai.analyze_message_context(context, analyze_method))
+        async def decide():
+            if ai_breaker.is_open():
+                return ModDecision(action=ModAction.NONE, reason="AI is unavailable", confidence=0.0, is_error=True)
+
+            # Link spam is what ends in bans, so it goes to the model first
+            priority = self._get_ai_priority(msg, is_ad and has_link)
+
+            # Flagged messages of the same chat share one context and one model request,
+            # the AI scheduler bounds the requests in flight and orders them by priority
+            return await self.ai_batcher.analyze(
+                msg.chat.id,
+                msg.from_user.id,
+                msg.id,
+                msg.text or msg.caption or "",
+                analyze_method,
+                lambda: self.build_context(msg),
+                priority
+            )
+
+        # Repeated spam texts reuse a confident decision without building the context again
+        decision_task = asyncio.create_task(decision_cache.get_or_decide(msg.text or msg.caption, analyze_method, decide))
         decision_task.add_done_callback(handle_ai_decision)
 
     async def _handle_decision(self, decision, msg, mod_actions):
@@ -158,17 +241,14 @@ class GroupCommands:
 
             _log.getLogger().debug(f"Applying moderation decision for user {user_id} in chat {chat_id}: {decision}")
 
+            if decision.is_error:
+                _log.getLogger().debug(f"Skipping a failed AI decision for user {user_id}: {decision.reason}")
+                return
+
             if decision.confidence < 0.5:
                 await self.client.send_message(chat_id, f"AI не уверен в своем решении для пользователя {user_id}. Пожалуйста, проверьте вручную.")
             else:
-                member = await self.client.get_chat_member(chat_id, user_id)
-
-                if member is None:
-                    _log.getLogger().error(f"User {user_id} is not a member of chat {chat_id}")
-                    await self.client.send_message(chat_id, "Пользователь не найден в чате.")
-                    return False
-
-                if member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
+                if await admin_roster.is_admin(self.client, chat_id, user_id):
                     _log.getLogger().debug(f"User {user_id} is an admin or owner in chat {chat_id}, cannot ban.")
                     await self.client.send_message(chat_id, f"Не удалось применить решение {decision.action.name}, так как пользователь является администратором или владельцем чата.")
                     return False
@@ -176,7 +256,8 @@ class GroupCommands:
                 await mod_actions.apply_decision(
                     chat_id,
                     user_id,
-                    decision
+                    decision,
+                    msg.id
                 )
         
         except Exception as e:
@@ -184,22 +265,30 @@ class GroupCommands:
             await self.client.send_message(msg.chat.id, f"Something was happened: {e}")
 
     async def build_context(self, msg):
-        """Build a message context from a list of messages.
-        :param msgs: List of MessageContext.Message objects.
-        :return: List of dictionaries representing the message context.
+        """Build the message context of the chat from the recent message buffer.
+        :param msg: The message that triggered the analysis.
+        :return: List of strings representing the message context.
         """
         context = MessageContext()
         _triggered_by = getattr(msg, "from_user", getattr(msg, "sender_name", None))
-        msgs = []
-
-        async for message in self.client.get_chat_history(msg.chat.id, limit=20):
-            msgs.append(MessageContext.Message(
-                sender_name=message.from_user.first_name,
-                text=message.text or "",
-                datetime=message.date.strftime("%Y-%m-%d %H:%M:%S"),
-                triggered_by=_triggered_by.first_name if _triggered_by else "Unknown",
-                reply_to=message.reply_to_message.text if message.reply_to_message else None
-            ))
+        triggered_by = _triggered_by.first_name if _triggered_by else "Unknown"
+
+        # The token budget trims the oldest lines, so the flagged message must be the newest one:
+        # messages that arrived after it are left out, and it is added back if it left the buffer
+        records = [record for record in message_buffer.get_recent(msg.chat.id) if record.message_id <= msg.id]
+        if not records or records[-1].message_id != msg.id:
+            records.append(BufferedMessage.from_message(msg))
+
+        msgs = [
+            MessageContext.Message(
+                sender_name=message.sender_name,
+                text=message.text,
+                datetime=datetime.fromtimestamp(message.date).strftime("%Y-%m-%d %H:%M:%S"),
+                triggered_by=triggered_by,
+                reply_to=message.reply_to
+            )
+            for message in records
+        ]
 
         context_list = context.build_message_context(msgs)
         return context_list
@@ -1,7 +1,7 @@
 from typing import Optional
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: int
     is_deleted: bool
@@ -0,0 +1,23 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.admin_roster import AdminRoster
+
+class _FakeClient:
+    def __init__(self, name: str, admin_ids):
+        self.name = name
+        self.admin_ids = admin_ids
+
+    async def get_chat_members(self, chat_id, filter=None):
+        for user_id in self.admin_ids:
+            yield SimpleNamespace(user=SimpleNamespace(id=user_id))
+
+def test_rosters_are_kept_per_client():
+    async def run():
+        roster = AdminRoster()
+        first, second = _FakeClient("first", [1]), _FakeClient("second", [2])
+
+        assert await roster.get_admins(first, 100) == {1}
+        assert await roster.get_admins(second, 100) == {2}
+
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import asyncio
+
+from core.ai_batcher import AIBatcher
+from core.ai_scheduler import AIScheduler
+from handlers.public._actions import ModAction, ModDecision
+
+async def _no_context():
+    return []
+
+class _SlowAI:
+    """Holds every request until release is set."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def analyze_message_context(self, context, method, on_decision=None):
+        self.calls += 1
+        await self.release.wait()
+        return ModDecision(action=ModAction.DELETE, reason="spam", confidence=0.9)
+
+    async def analyze_batch(self, context, flagged, on_decision=None):
+        self.calls += 1
+        await self.release.wait()
+        return {message_id: ModDecision(action=ModAction.DELETE, reason="spam", confidence=0.9) for message_id, _, _ in flagged}
+
+def test_batch_recovers_after_queue_timeout():
+    async def run():
+        ai = _SlowAI()
+        scheduler = AIScheduler(max_concurrency=1, max_queue=10, queue_timeout=0.1)
+        batcher = AIBatcher(ai, scheduler=scheduler, window=0.01)
+
+        # Chat 1 takes the only slot, so the batch of chat 2 times out in the queue
+        busy = asyncio.create_task(batcher.analyze(1, 1, 1, "a", "re.search", _no_context))
+        await asyncio.sleep(0.05)
+        decision = await asyncio.wait_for(batcher.analyze(2, 2, 2, "b", "re.search", _no_context), 1)
+        assert decision.is_error
+        assert 2 not in batcher._batches
+
+        ai.release.set()
+        await busy
+
+        decision = await asyncio.wait_for(batcher.analyze(2, 3, 3, "c", "re.search", _no_context), 1)
+        assert not decision.is_error
+        assert decision.action == ModAction.DELETE
+
+    asyncio.run(run())
+
+def test_batch_recovers_after_queue_full():
+    async def run():
+        ai = _SlowAI()
+        scheduler = AIScheduler(max_concurrency=1, max_queue=0, queue_timeout=10)
+        batcher = AIBatcher(ai, scheduler=scheduler, window=0.01)
+
+        decision = await asyncio.wait_for(batcher.analyze(1, 1, 1, "a", "re.search", _no_context), 1)
+        assert decision.is_error
+        assert 1 not in batcher._batches
+
+        scheduler.max_queue = 10
+        ai.release.set()
+
+        decision = await asyncio.wait_for(batcher.analyze(1, 2, 2, "b", "re.search", _no_context), 1)
+        assert not decision.is_error
+
+    asyncio.run(run())
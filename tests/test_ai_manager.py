@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+import core.ai_manager as ai_manager
+from constants import AI_MAX_COMPLETION_TOKENS
+from core.ai_manager import AIManager
+from core.circuit_breaker import CircuitBreaker, CircuitState
+
+class _SlowAIManager(AIManager):
+    """Answers every request after a fixed delay, without a client."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def _request(self, messages, model, max_completion_tokens):
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60, latency_slo=0.1)
+    monkeypatch.setattr(ai_manager, "ai_breaker", breaker)
+    monkeypatch.setattr(ai_manager, "AI_REQUEST_TIMEOUT", 0.1)
+    return breaker
+
+def test_batch_within_scaled_timeout_is_not_a_failure(breaker):
+    # Four messages get four times the timeout, the request takes longer than one but fits
+    ai = _SlowAIManager(0.2)
+    response = asyncio.run(ai._complete([], "model", AI_MAX_COMPLETION_TOKENS * 4))
+
+    assert response == "ok"
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+def test_single_request_over_timeout_is_a_failure(breaker):
+    ai = _SlowAIManager(0.2)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ai._complete([], "model", AI_MAX_COMPLETION_TOKENS))
+
+    assert breaker.state == CircuitState.OPEN
@@ -0,0 +1,26 @@
+import asyncio
+
+from handlers.public._banned_words import BannedWordStore
+
+class _FailingDB:
+    """The startup load fails and every chat has no banned words."""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def find_data_in_collection_by(self, find_by, projection=None):
+        self.queries += 1
+        return None if not find_by else []
+
+def test_missing_version_is_cached():
+    async def run():
+        db = _FailingDB()
+        store = BannedWordStore(db)
+        assert not await store.load()
+
+        assert await store.get_matcher(100) is None
+        assert await store.get_matcher(100) is None
+        # One query for the failed load, one for the chat
+        assert db.queries == 2
+
+    asyncio.run(run())
@@ -0,0 +1,28 @@
+from core.decision_stream import DecisionStreamParser
+from handlers.public._actions import ModAction
+
+def _feed(response: str):
+    early = []
+    parser = DecisionStreamParser(lambda message_id, decision: early.append((decision.action, decision.duration)))
+    parser.feed(response)
+    return early, parser.close()
+
+def test_mute_waits_for_duration():
+    early, decisions = _feed("ACTION: mute\nCONFIDENCE: 0.9\nDURATION: 600\nREASON: spam\n")
+    assert early == [(ModAction.MUTE, 600)]
+    assert decisions[None].duration == 600
+
+def test_mute_without_duration_is_built_on_close():
+    early, decisions = _feed("ACTION: mute\nCONFIDENCE: 0.9\nREASON: spam")
+    assert early == []
+    assert decisions[None].action == ModAction.MUTE
+
+def test_delete_is_dispatched_before_the_reason():
+    early = []
+    parser = DecisionStreamParser(lambda message_id, decision: early.append(decision))
+    parser.feed("ACTION: delete\nCONFIDENCE: 0.9\n")
+    assert len(early) == 1
+
+    parser.feed("REASON: spam\n")
+    parser.close()
+    assert early[0].reason == "spam"
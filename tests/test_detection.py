@@ -0,0 +1,19 @@
+import asyncio
+from types import SimpleNamespace
+
+from handlers.public._detection import DetectionExecutor
+from handlers.public._pattern_engine import CompiledPatternSet
+
+def test_fuzzy_mode_detects_in_worker_processes():
+    async def run():
+        executor = DetectionExecutor(mode="fuzzy", max_workers=1)
+        try:
+            msg = SimpleNamespace(text="играй в казино, переходи t.me/spam", caption=None, entities=None)
+            result = await executor.detect(msg, CompiledPatternSet([{"text": "казино"}]))
+        finally:
+            executor.shutdown()
+
+        assert result.is_triggered
+        assert result.ad.is_ad
+
+    asyncio.run(run())
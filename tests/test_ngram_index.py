@@ -0,0 +1,43 @@
+import random
+
+from fuzzywuzzy import fuzz
+
+from handlers.public._ngram_index import NGramIndex
+
+THRESHOLD = 85
+
+def _mutate(rng: random.Random, s: str, alphabet: str) -> str:
+    chars = list(s)
+    for _ in range(rng.randint(0, 3)):
+        operation = rng.choice(("insert", "delete", "replace"))
+        position = rng.randrange(len(chars) + 1)
+        if operation == "insert" or not chars:
+            chars.insert(position, rng.choice(alphabet))
+        elif position < len(chars):
+            if operation == "delete":
+                del chars[position]
+            else:
+                chars[position] = rng.choice(alphabet)
+    return "".join(chars)
+
+def test_candidates_never_prune_a_match():
+    rng = random.Random(0)
+    alphabet = "abcdefghijklmnop"
+
+    for _ in range(300):
+        strings = ["".join(rng.choices(alphabet, k=rng.randint(3, 20))) for _ in range(10)]
+        index = NGramIndex(strings)
+
+        for _ in range(10):
+            source = rng.choice(strings)
+            text = "".join(rng.choices(alphabet, k=rng.randint(0, 10))) + _mutate(rng, source, alphabet) + "".join(rng.choices(alphabet, k=rng.randint(0, 10)))
+            candidates = set(index.candidates(text, THRESHOLD))
+
+            for i, s in enumerate(strings):
+                if fuzz.partial_ratio(s, text) >= THRESHOLD:
+                    assert i in candidates, (s, text, fuzz.partial_ratio(s, text))
+
+def test_reported_miss_is_a_candidate():
+    s, text = "jnaelmbanahjn", "nhkbffjpjnkailmbaahjniigjlombf"
+    assert fuzz.partial_ratio(s, text) >= THRESHOLD
+    assert 0 in NGramIndex([s]).candidates(text, THRESHOLD)
@@ -0,0 +1,29 @@
+from handlers.public._normalizer import canonicalize
+
+def test_double_letters_are_kept():
+    assert canonicalize("ссылка") == "ссылка"
+    assert canonicalize("Ccылкa") == "ссылка"
+
+def test_stretched_letters_are_collapsed():
+    assert canonicalize("приииивет") == "привет"
+    assert canonicalize("heeeey") == "hey"
+
+def test_homoglyphs_and_leetspeak_are_folded():
+    assert canonicalize("пр0м0код") == "промокод"
+    assert canonicalize("fr33 m0ney") == "free money"
+
+def test_numbers_are_kept():
+    assert canonicalize("Заработок 1000$") == "заработок 1000$"
+    assert canonicalize("1000") == "1000"
+    assert canonicalize("+79991112233") == "+79991112233"
+    assert canonicalize("5000р") == "5000р"
+    assert canonicalize("$100") == "$100"
+    assert canonicalize("100€") == "100€"
+
+def test_words_with_real_digits_are_not_leetspeak():
+    assert canonicalize("covid19") == "covid19"
+
+def test_amounts_get_distinct_decision_keys():
+    from core.decision_cache import DecisionCache
+
+    assert DecisionCache.make_key("Переведи 1000 руб", "re.search") != DecisionCache.make_key("Переведи 10 руб", "re.search")
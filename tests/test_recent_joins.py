@@ -0,0 +1,26 @@
+import asyncio
+from types import SimpleNamespace
+
+from pyrogram.enums import ChatMemberStatus
+
+from core.recent_joins import RecentJoins
+
+def _update(user_id: int, old_status, new_status):
+    member = lambda status: SimpleNamespace(user=SimpleNamespace(id=user_id), status=status) if status else None
+    return SimpleNamespace(chat=SimpleNamespace(id=100), old_chat_member=member(old_status), new_chat_member=member(new_status))
+
+def test_only_joins_are_recorded():
+    async def run():
+        joins = RecentJoins()
+
+        await joins.on_chat_member_updated(None, _update(1, ChatMemberStatus.LEFT, ChatMemberStatus.MEMBER))
+        await joins.on_chat_member_updated(None, _update(2, None, ChatMemberStatus.MEMBER))
+        # A promotion and a leave are not joins
+        await joins.on_chat_member_updated(None, _update(3, ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR))
+        await joins.on_chat_member_updated(None, _update(4, None, ChatMemberStatus.LEFT))
+
+        assert joins.is_new(100, 1) and joins.is_new(100, 2)
+        assert not joins.is_new(100, 3) and not joins.is_new(100, 4)
+        assert not joins.is_new(200, 1)
+
+    asyncio.run(run())